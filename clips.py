@@ -0,0 +1,149 @@
+# Cuts a short clip around every touch of a recorded bout out of a video of it, for review.
+#
+# Usage:
+#     python clips.py captures/bout.txt strip1.mp4 --offset 3.2 --out clips/
+#     python clips.py captures/bout.txt strip1.mp4 --video-start "2025-04-07 15:47:40.2"
+#
+# The recording (python main.py --record, or a testing/device.py capture) is scored with the same
+# scorer as the live loop (rescore.score_bout), which gives the time of every touch. --offset is
+# the video time of the recording's first report; for a camera whose clock is in sync with the
+# scoring PC, --video-start (wall-clock time of the video's first frame) works instead.
+#
+# Clips are stream copies (ffmpeg -c copy, no re-encode), which can only start on a keyframe, so
+# each clip starts at the last keyframe at least --before seconds ahead of its touch. Keyframe
+# times come from the video's packet index (ffprobe, no decoding). Touches whose clips would
+# overlap share one clip, and clips are cut in parallel.
+#
+# Writes the clips and index.csv to --out: one row per touch with its time in the bout and in the
+# video, the clip it is in and where in that clip it happens. Needs ffmpeg and ffprobe on PATH.
+import os
+import sys
+import csv
+import shutil
+import argparse
+import subprocess
+from bisect import bisect_right
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from gui_src.bout import default_settings
+from rescore import pack_captures, score_bout
+
+INDEX_COLUMNS = ['touch', 'side', 'kind', 'bout_time', 'video_time', 'clip', 'clip_start', 'time_in_clip']
+
+
+def bout_touches(path, settings, kinds=('touch', 'self')):
+    """(start_time, [(seconds since the first report, side, kind), ...]) of a recorded bout."""
+    reports, times, bouts = pack_captures([path])
+    if not bouts:
+        raise ValueError(f"{path} has no reports")
+    _, start_time, _, _ = bouts[0]
+    result = score_bout(reports, times, start_time, settings)
+    return start_time, [touch for touch in result['touches'] if touch[2] in kinds]
+
+
+def keyframe_times(video):
+    """Sorted presentation times (seconds) of the video stream's keyframes."""
+    output = subprocess.run(
+        ['ffprobe', '-v', 'error', '-select_streams', 'v:0', '-show_entries', 'packet=pts_time,flags',
+         '-of', 'csv=p=0', video],
+        check=True, capture_output=True, text=True).stdout
+    times = []
+    for line in output.splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags and pts_time not in ('', 'N/A'):
+            times.append(float(pts_time))
+    return sorted(times)
+
+
+def plan_clips(touch_times, keyframes, before, after):
+    """
+    Clip windows for touches at touch_times (video seconds, ascending): [(start, end, [touch index])].
+    Each window starts on the last keyframe at least `before` ahead of its first touch and ends
+    `after` past its last one; touches whose windows would overlap are merged into one clip.
+    """
+    clips = []
+    for i, t in enumerate(touch_times):
+        k = bisect_right(keyframes, t - before) - 1
+        start = keyframes[k] if k >= 0 else 0.0
+        if clips and start <= clips[-1][1]:
+            clips[-1][1] = t + after
+            clips[-1][2].append(i)
+        else:
+            clips.append([start, t + after, [i]])
+    return [tuple(clip) for clip in clips]
+
+
+def cut_clip(video, start, end, path):
+    """Copies [start, end) of video to path without re-encoding. start should be a keyframe."""
+    subprocess.run(
+        ['ffmpeg', '-v', 'error', '-y', '-ss', f"{start:.6f}", '-i', video, '-t', f"{end - start:.3f}",
+         '-map', '0', '-c', 'copy', '-avoid_negative_ts', 'make_zero', path],
+        check=True, capture_output=True)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cut a clip around every touch of a recorded bout from its video")
+    parser.add_argument('capture', help="recording of the bout (main.py --record or testing/device.py)")
+    parser.add_argument('video', help="video of the bout")
+    sync = parser.add_mutually_exclusive_group(required=True)
+    sync.add_argument('--offset', type=float, help="video time (seconds) of the recording's first report")
+    sync.add_argument('--video-start', help="wall-clock time of the video's first frame, e.g. '2025-04-07 15:47:40.2'")
+    parser.add_argument('--before', type=float, default=4.0, help="seconds of video before each touch (at least)")
+    parser.add_argument('--after', type=float, default=2.0, help="seconds of video after each touch")
+    parser.add_argument('--held', action='store_true', help="also clip held touches (continuous damage starting)")
+    parser.add_argument('--rules', help="rule set the bout was scored with (default: built-in scorer)")
+    parser.add_argument('--workers', type=int, default=None, help="clips cut at once (default: all cores)")
+    parser.add_argument('--out', default='clips', help="directory for the clips and index.csv")
+    args = parser.parse_args(argv)
+
+    for tool in ('ffmpeg', 'ffprobe'):
+        if shutil.which(tool) is None:
+            sys.exit(f"{tool} not found on PATH")
+
+    kinds = ('touch', 'self', 'held') if args.held else ('touch', 'self')
+    start_time, touches = bout_touches(args.capture, {**default_settings(), 'ruleset': args.rules}, kinds)
+    if args.offset is not None:
+        offset = args.offset
+    else:
+        offset = (start_time - datetime.fromisoformat(args.video_start)).total_seconds()
+    early = [touch for touch in touches if touch[0] + offset < 0]
+    if early:
+        print(f"Skipping {len(early)} touches from before the video starts", file=sys.stderr)
+        touches = [touch for touch in touches if touch[0] + offset >= 0]
+    if not touches:
+        sys.exit(f"No touches scored in {args.capture}")
+
+    keyframes = keyframe_times(args.video)
+    video_times = [t + offset for t, _, _ in touches]
+    clips = plan_clips(video_times, keyframes, args.before, args.after)
+    os.makedirs(args.out, exist_ok=True)
+    extension = os.path.splitext(args.video)[1] or '.mp4'
+    paths = [os.path.join(args.out, f"clip-{n + 1:03d}-{video_times[members[0]]:08.2f}s{extension}")
+             for n, (_, _, members) in enumerate(clips)]
+
+    print(f"{len(touches)} touches -> {len(clips)} clips from {len(keyframes)} keyframes", file=sys.stderr)
+    with ThreadPoolExecutor(max_workers=args.workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(cut_clip, args.video, start, end, path)
+                   for (start, end, _), path in zip(clips, paths)]
+        for future in futures:
+            future.result()  # raises if ffmpeg failed
+
+    with open(os.path.join(args.out, 'index.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_COLUMNS)
+        writer.writeheader()
+        for (start, _, members), path in zip(clips, paths):
+            for i in members:
+                t, side, kind = touches[i]
+                writer.writerow({
+                    'touch': i + 1, 'side': side, 'kind': kind,
+                    'bout_time': f"{t:.3f}", 'video_time': f"{video_times[i]:.3f}",
+                    'clip': os.path.basename(path), 'clip_start': f"{start:.3f}",
+                    'time_in_clip': f"{video_times[i] - start:.3f}",
+                })
+    print(f"Wrote {len(clips)} clips and index.csv to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
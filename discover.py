@@ -0,0 +1,247 @@
+# Finds the VSM codes detect_hit_state doesn't know, across any amount of captures, and proposes
+# what they mean.
+#
+# Usage:
+#     python discover.py captures/ testing/states/ --table decode_table.py --json histograms.json
+#
+# Every report of every capture (files, or directories of them) is counted into fixed-size
+# histograms, chunk by chunk, so memory doesn't grow with the corpus:
+#   - every (byte position, value)
+#   - every (left, right) code pair, over all 20 sub-samples
+#   - per side, every (newer sample, older sample) code pair of neighbouring sub-samples, and
+#     every (code, newest code of the next report)
+# The sub-samples are a delay line (see testing/states/explanation.md), so neighbouring samples
+# show what a code sits between. An unknown code whose neighbours are mostly itself is a steady
+# state of its own, and it is proposed as the status it is usually entered from or left for. One
+# whose neighbours are other codes is a transient seen mid-change, and it is proposed as the
+# status around it. Unknown codes with similar contexts are clustered together, and the known
+# code nearest in bits is listed as a hint.
+#
+# --table writes the known codes plus the proposals as a decode table module with its own
+# detect_hit_state, for review before the codes go into main.py.
+import os
+import sys
+import json
+import argparse
+import numpy as np
+
+from gui_src.capture import list_captures
+from gui_src.devices import REPORT_SIZE
+from gui_src.filters import decode_tables
+from main import detect_hit_state
+
+CHUNK_REPORTS = 65536  # reports parsed and counted at a time
+SUBSAMPLES = (REPORT_SIZE - 2) // 2
+STEADY = 0.5  # share of a code's neighbours that are itself above which it's a steady state
+CLUSTER_DISTANCE = 0.5  # L1 distance between context distributions that still joins a cluster
+
+
+class CodeStats:
+    """The histograms. Fixed size whatever the corpus: about 1.6 MB."""
+
+    def __init__(self):
+        self.reports = 0
+        self.positions = np.zeros((REPORT_SIZE, 256), dtype=np.int64)
+        self.pairs = np.zeros((256, 256), dtype=np.int64)  # [left code, right code], all sub-samples
+        self.adjacent = np.zeros((2, 256, 256), dtype=np.int64)  # [side, newer sample, older sample]
+        self.following = np.zeros((2, 256, 256), dtype=np.int64)  # [side, newest code, next report's newest]
+        self._last = None  # previous chunk's last report, so `following` spans chunk boundaries
+
+    def end_capture(self):
+        """Call between captures: the next report isn't a follow-up of the last one."""
+        self._last = None
+
+    def add(self, reports):
+        """reports: (n, REPORT_SIZE) uint8 array."""
+        n = len(reports)
+        if not n:
+            return
+        self.reports += n
+        wide = reports.astype(np.intp)
+        self.positions += np.bincount((wide + np.arange(REPORT_SIZE) * 256).ravel(),
+                                      minlength=REPORT_SIZE * 256).reshape(REPORT_SIZE, 256)
+        samples = wide[:, 2:2 + 2 * SUBSAMPLES].reshape(n, SUBSAMPLES, 2)
+        self.pairs += np.bincount((samples[:, :, 0] * 256 + samples[:, :, 1]).ravel(),
+                                  minlength=65536).reshape(256, 256)
+        newest = samples[:, 0, :]
+        if self._last is not None:
+            newest = np.vstack([self._last, newest])
+        self._last = samples[-1:, 0, :]
+        for side in (0, 1):
+            codes = samples[:, :, side]
+            self.adjacent[side] += np.bincount((codes[:, :-1] * 256 + codes[:, 1:]).ravel(),
+                                               minlength=65536).reshape(256, 256)
+            self.following[side] += np.bincount(newest[:-1, side] * 256 + newest[1:, side],
+                                                minlength=65536).reshape(256, 256)
+
+
+def iter_report_chunks(path, chunk_reports=CHUNK_REPORTS):
+    """Yields (n, REPORT_SIZE) uint8 arrays of a capture's full-length reports, in file order."""
+    bodies = []
+    with open(path, errors='replace') as f:
+        for line in f:
+            if 'Raw data' not in line:
+                continue
+            body = line[line.find('[') + 1:line.rfind(']')]
+            if body.count(',') == REPORT_SIZE - 1:
+                bodies.append(body)
+                if len(bodies) == chunk_reports:
+                    yield _parse(bodies)
+                    bodies = []
+    if bodies:
+        yield _parse(bodies)
+
+
+def _parse(bodies):
+    return np.fromstring(','.join(bodies), dtype=np.uint8, sep=',').reshape(-1, REPORT_SIZE)
+
+
+def scan(paths, stats=None):
+    stats = stats or CodeStats()
+    for path in paths:
+        for chunk in iter_report_chunks(path):
+            stats.add(chunk)
+        stats.end_capture()
+    return stats
+
+
+# ---------------------------------------------------------------------------
+# Proposals
+# ---------------------------------------------------------------------------
+
+def known_codes():
+    """Per side, {code: status} for every code detect_hit_state decodes to something other than UNKNOWN."""
+    statuses, left, right = decode_tables(detect_hit_state)
+    return [{code: statuses[table[code]] for code in range(256) if statuses[table[code]] != "UNKNOWN"}
+            for table in (left, right)]
+
+
+def propose(stats, known):
+    """
+    One proposal per (side, unknown code) seen in the newest or any sub-sample position:
+    dicts with side, code, count, steady (share of neighbours that are itself), context
+    ({status: share} of the other neighbours), status, confidence, nearest known code.
+    """
+    proposals = []
+    for side, name in ((0, 'left'), (1, 'right')):
+        table = known[side]
+        counts = stats.positions[2 + side:REPORT_SIZE:2].sum(axis=0)
+        for code in np.flatnonzero(counts):
+            code = int(code)
+            if code in table:
+                continue
+            adjacent, following = stats.adjacent[side], stats.following[side]
+            neighbours = adjacent[code, :] + adjacent[:, code] + following[code, :] + following[:, code]
+            total = int(neighbours.sum())
+            own = int(neighbours[code])
+            context = {}
+            for other in np.flatnonzero(neighbours):
+                if int(other) != code:
+                    status = table.get(int(other), "UNKNOWN")
+                    context[status] = context.get(status, 0) + int(neighbours[other]) / max(1, total - own)
+            status, confidence = max(context.items(), key=lambda item: item[1], default=("UNKNOWN", 0.0))
+            nearest = min(table, key=lambda known_code: (bin(known_code ^ code).count('1'), known_code))
+            proposals.append({
+                'side': name, 'code': code, 'count': int(counts[code]),
+                'steady': own / total if total else 0.0,
+                'context': dict(sorted(context.items(), key=lambda item: -item[1])),
+                'status': status, 'confidence': confidence,
+                'nearest': nearest, 'nearest_status': table[nearest],
+            })
+    return proposals
+
+
+def cluster(proposals):
+    """
+    Groups proposals (per side) whose context distributions are within CLUSTER_DISTANCE (L1),
+    most frequent code first; sets each one's 'cluster'. Returns the number of clusters.
+    """
+    centroids = []  # (side, steady?, context)
+    for proposal in sorted(proposals, key=lambda p: -p['count']):
+        kind = (proposal['side'], proposal['steady'] >= STEADY)
+        for i, (centroid_kind, context) in enumerate(centroids):
+            keys = set(context) | set(proposal['context'])
+            distance = sum(abs(context.get(k, 0.0) - proposal['context'].get(k, 0.0)) for k in keys)
+            if centroid_kind == kind and distance <= CLUSTER_DISTANCE:
+                proposal['cluster'] = i
+                break
+        else:
+            proposal['cluster'] = len(centroids)
+            centroids.append((kind, proposal['context']))
+    return len(centroids)
+
+
+def decode_table_module(known, proposals, min_confidence):
+    """Source of a module with LEFT_CODES / RIGHT_CODES (known + proposed) and a detect_hit_state."""
+    lines = ['# Generated by discover.py: the codes main.detect_hit_state knows, plus proposals for',
+             '# unknown ones (commented with their evidence). Review before relying on it.', '']
+    for side, name in ((0, 'LEFT'), (1, 'RIGHT')):
+        lines.append(f"{name}_CODES = {{")
+        for code, status in sorted(known[side].items()):
+            lines.append(f"    {code}: {status!r},")
+        for p in sorted((p for p in proposals if p['side'] == name.lower()), key=lambda p: p['code']):
+            entry = f"{p['code']}: {p['status']!r},"
+            evidence = (f"seen {p['count']}x, {'steady' if p['steady'] >= STEADY else 'transient'}, "
+                        f"{p['confidence']:.0%} next to {p['status']}, cluster {p['cluster']}")
+            if p['status'] == "UNKNOWN" or p['confidence'] < min_confidence:
+                lines.append(f"    # {entry}  # {evidence} (low confidence)")
+            else:
+                lines.append(f"    {entry}  # {evidence}")
+        lines.append("}")
+        lines.append("")
+    lines += [
+        "",
+        "def detect_hit_state(data):",
+        "    if len(data) < 4:",
+        "        return 'UNKNOWN', 'UNKNOWN'",
+        "    return LEFT_CODES.get(data[2], 'UNKNOWN'), RIGHT_CODES.get(data[3], 'UNKNOWN')",
+        "",
+    ]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Histogram VSM codes over captures and propose meanings for unknown ones")
+    parser.add_argument('captures', nargs='+', help="capture files or directories of them")
+    parser.add_argument('--table', help="write a decode table module (known + proposed codes) here")
+    parser.add_argument('--json', help="write the histograms and proposals here")
+    parser.add_argument('--min-confidence', type=float, default=0.6,
+                        help="proposals below this share of their context are commented out in --table")
+    args = parser.parse_args(argv)
+
+    paths = []
+    for path in args.captures:
+        paths.extend(list_captures(path) if os.path.isdir(path) else [path])
+    stats = scan(paths)
+    if not stats.reports:
+        sys.exit("No reports found")
+
+    known = known_codes()
+    proposals = propose(stats, known)
+    n_clusters = cluster(proposals)
+    newest = stats.positions[2:4]
+    unknown_newest = [sum(int(newest[side, code]) for code in range(256) if code not in known[side]) for side in (0, 1)]
+    print(f"{stats.reports} reports in {len(paths)} files; newest sample UNKNOWN: "
+          f"left {unknown_newest[0]}, right {unknown_newest[1]}")
+    print(f"{len(proposals)} unknown codes in {n_clusters} clusters\n")
+    print(f"{'side':5} {'code':>4} {'count':>9} {'steady':>7} {'proposal':18} {'conf':>5} {'nearest':>12} "
+          f"{'cluster':>7}  context")
+    for p in sorted(proposals, key=lambda p: (p['side'], p['cluster'], -p['count'])):
+        context = ', '.join(f"{status} {share:.0%}" for status, share in list(p['context'].items())[:3])
+        print(f"{p['side']:5} {p['code']:4d} {p['count']:9d} {p['steady']:7.0%} {p['status']:18} "
+              f"{p['confidence']:5.0%} {p['nearest']:4d} ({p['nearest_status'][:5]}) {p['cluster']:7d}  {context}")
+
+    if args.table:
+        with open(args.table, 'w') as f:
+            f.write(decode_table_module(known, proposals, args.min_confidence))
+        print(f"\nDecode table written to {args.table}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'reports': stats.reports, 'positions': stats.positions.tolist(),
+                       'pairs': {f"{l},{r}": int(stats.pairs[l, r]) for l, r in zip(*np.nonzero(stats.pairs))},
+                       'proposals': proposals}, f)
+        print(f"Histograms written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -41,6 +41,8 @@ class DummyVSMDevice:
             pass  # Ignore non-character keys
 
     def read(self, size, timeout_ms=None):
+        if timeout_ms == 0:
+            return []  # reports are made on demand, none are ever waiting
         # Simulate the ~100ms delay or blocking read of the real device
         time.sleep(0.1)
 
@@ -62,8 +64,9 @@ class DummyVSMDevice:
                 # From states/neutral: data[2]=4, data[3]=80
                 data = [0, 0, 4, 80]
 
-                # Pad to the requested size (typically 42 bytes)
-        data = data[:size]  # Ensure we don't exceed size
+        # The real box repeats a steady state across all 20 sub-samples (bytes 2..41), so --filter
+        # sees the same pair everywhere instead of zero codes it can't decode
+        data = (data[:2] + data[2:4] * 20)[:size]
         data += [0] * (size - len(data))
         time.sleep(0.01)
         return data
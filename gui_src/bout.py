@@ -0,0 +1,332 @@
+import queue
+from time import perf_counter, monotonic
+from threading import Thread, Event
+from gui_src import startup
+from gui_src.capture import start_recording
+from gui_src.devices import wait_for_device, read_batch, REPORT_SIZE
+from gui_src.filters import make_detector, decode_tables
+from gui_src.metrics import REGISTRY
+from gui_src.profiler import PROFILER
+from gui_src.telemetry import event, INFO
+from gui_src.player import ScoringManager
+from gui_src.scorer import BoutScorer
+from gui_src.timers import MonotonicClock, DeviceClock
+from gui_src.settings import (
+    GLOBAL_HIT_DMG,
+    GLOBAL_HIT_DMG_SELF,
+    GLOBAL_HIT_DMG_PER_MILLISECOND,
+    MAX_HP,
+    DEBOUNCE_TIME_SEC,
+    secBeforeContDmg,
+    RULESET,
+    STATE_FILTER,
+    STATE_FILTER_VOTES,
+    STATE_FILTER_RUN,
+    DEVICE_CLOCK,
+    DEVICE_CLOCK_WINDOW,
+    BATCH_READ,
+    BATCH_READ_MAX,
+    REPORT_INTERVAL_SEC,
+    RECORD_DIR,
+)
+
+DEVICE_READ_ERROR = event("device_read_error", INFO)
+DEVICE_RECONNECTED = event("device_reconnected", INFO)
+
+
+def default_settings():
+    """Game settings dict built from the constants in settings.py."""
+    return {
+        'hit_dmg': GLOBAL_HIT_DMG,
+        'hit_dmg_self': GLOBAL_HIT_DMG_SELF,
+        'hit_dmg_per_ms': GLOBAL_HIT_DMG_PER_MILLISECOND,
+        'max_hp': MAX_HP,
+        'debounce_time': DEBOUNCE_TIME_SEC,
+        'sec_before_cont_dmg': secBeforeContDmg,
+        'ruleset': RULESET,
+        'state_filter': STATE_FILTER,
+        'state_filter_votes': STATE_FILTER_VOTES,
+        'state_filter_run': STATE_FILTER_RUN,
+        'device_clock': DEVICE_CLOCK,
+        'batch_read': BATCH_READ,
+        'record_dir': RECORD_DIR,
+    }
+
+
+class BoutPipeline:
+    """
+    One strip's scoring pipeline: finds the VSM device, reads it on a background thread,
+    runs the ScoringManager, and posts GUI messages to output_queue.
+    Has no Tk dependencies, so one window can drive one or many of these.
+    """
+
+    def __init__(self, find_device, detect_hit_state, settings, name="strip"):
+        # find_device should return the VSM device, or None if it's not found
+        self.find_device = find_device
+        self.detect_hit_state = detect_hit_state
+        self.name = name  # labels this strip's metrics
+
+        self.output_queue = queue.Queue()
+        self.stop_event = Event()
+
+        self.scoring_manager = ScoringManager(settings)
+
+        self.current_device = None
+        self.device_thread = None
+
+        # see gui_src/metrics.py; all but queue_depth are only written by the device thread
+        self.metrics = {
+            'reports': REGISTRY.counter('vsm_reports_total', "Reports read from the device", strip=name),
+            'read_timeouts': REGISTRY.counter('vsm_read_timeouts_total', "Reads that returned no report",
+                                              strip=name),
+            'unknown': REGISTRY.counter('vsm_unknown_reports_total', "Reports with an UNKNOWN left or right code",
+                                        strip=name),
+            'read_errors': REGISTRY.counter('vsm_read_errors_total', "Device read errors (e.g. unplugged)",
+                                            strip=name),
+            'reconnects': REGISTRY.counter('vsm_reconnects_total', "Successful reconnects after a read error",
+                                           strip=name),
+            'connected': REGISTRY.gauge('vsm_device_connected', "1 while a device is open", strip=name),
+            'read_seconds': REGISTRY.histogram('vsm_read_seconds', "Time blocked in device.read()", strip=name),
+            'process_seconds': REGISTRY.histogram('vsm_process_seconds', "Time scoring one read", strip=name),
+            'batch_reports': REGISTRY.histogram('vsm_batch_reports', "Reports drained per read (batch reads)",
+                                                buckets=(1, 2, 4, 8, 16, 32, 64), strip=name),
+        }
+        REGISTRY.gauge('vsm_output_queue_depth', "Messages waiting for the GUI", function=self.output_queue.qsize,
+                       strip=name)
+
+    def make_scorer(self, start_time):
+        """Per-report scorer for one run of the device loop."""
+        detect_hit_state = make_detector(self.detect_hit_state, self.scoring_manager.settings)
+        emit = self.output_queue.put
+        if self.scoring_manager.settings.get('ruleset'):
+            from gui_src.rules import RuleScorer
+            return RuleScorer(self.scoring_manager, detect_hit_state, emit, start_time)
+        return BoutScorer(self.scoring_manager, detect_hit_state, emit, start_time)
+
+    def _status(self, message):
+        self.output_queue.put({'type': 'status', 'message': message})
+
+    def start(self):
+        self.device_thread = self.start_device_thread()
+
+    def restart(self):
+        self.device_thread = self.restart_device_thread(self.device_thread)
+
+    def winner(self):
+        """Returns 'left' or 'right' once a player has brought the other to 0 HP, else None."""
+        left_hp, right_hp = self.scoring_manager.get_hp()
+        if left_hp <= 0:
+            return 'right'
+        if right_hp <= 0:
+            return 'left'
+        return None
+
+    def stop(self):
+        """Stops the device thread and closes the device."""
+        self.stop_event.set()  # Signal the processing thread to stop
+
+        # Explicitly close the device if it exists
+        if self.current_device:
+            print("Closing device on exit...")
+            try:
+                self.current_device.close()
+            except Exception as e:
+                print(f"Error closing device on exit: {e}")
+            self.current_device = None
+
+        # Wait for the thread to finish
+        if self.device_thread and self.device_thread.is_alive():
+            print("Joining device thread on exit...")
+            self.device_thread.join(timeout=1.0)  # Wait briefly
+
+    def start_device_thread(self):
+        """Finds the device and starts the processing thread."""
+
+        def thread_target():
+            vsm_device = self.find_device()
+            if vsm_device:
+                startup.mark("device opened")
+                return self.process_vsm_data(vsm_device)  # this is a blocking call (while loop)
+            else:
+                self.output_queue.put({'type': 'status', 'message': "VSM device not found."})
+                self.output_queue.put({'type': 'status', 'message': "Check connection/permissions."})
+
+            # Wakes up on hot-plug events, or retries with backoff when they aren't available
+            vsm_device = wait_for_device(self.find_device, self.stop_event, status=self._status)
+            if not vsm_device:
+                return  # stopped while waiting
+            return self.process_vsm_data(vsm_device)
+
+        thread = Thread(target=thread_target, daemon=True)
+        thread.start()
+        return thread
+
+    def restart_device_thread(self, current_thread=None):
+        """Stops the current device thread and starts a new one with updated settings."""
+        print("Restarting device thread...")
+        # 1. Signal the thread to stop
+        self.stop_event.set()
+
+        # 2. Explicitly close the current device *before* joining
+        #    This helps ensure resources like the pynput listener are released promptly.
+        if self.current_device:
+            print(f"Closing current device: {self.current_device}")
+            try:
+                self.current_device.close()
+            except Exception as e:
+                print(f"Error closing device during restart: {e}")
+            self.current_device = None  # Clear the reference
+
+        # 3. Wait for the old thread to terminate
+        if current_thread and current_thread.is_alive():
+            print("Joining old device thread...")
+            current_thread.join(timeout=2.0)  # Increased timeout slightly
+            if current_thread.is_alive():
+                print("Warning: Old device thread did not terminate cleanly.")
+
+        # 4. Reset the stop event for the new thread
+        self.stop_event.clear()
+        print("Stop event cleared.")
+
+        # Start a new thread
+        return self.start_device_thread()
+
+    def process_vsm_data(self, device):
+        """
+        Reads data from the VSM device and feeds each report to a BoutScorer, which
+        detects state changes, applies debouncing, delegates scoring logic to
+        ScoringManager, and puts formatted messages into the output queue.
+        Runs until stop_event is set.
+        """
+        clock = MonotonicClock()  # report timestamps that can't jump with the wall clock
+        device_clock = DeviceClock(DEVICE_CLOCK_WINDOW) if self.scoring_manager.settings.get('device_clock') else None
+        metrics = self.metrics
+        if device_clock:
+            REGISTRY.gauge('vsm_dropped_reports', "Reports missing from the device counter sequence",
+                           function=lambda: device_clock.dropped, strip=self.name)
+            REGISTRY.gauge('vsm_duplicate_reports', "Reports repeating the previous counter value",
+                           function=lambda: device_clock.duplicates, strip=self.name)
+        statuses, left_codes, right_codes = decode_tables(self.detect_hit_state)
+        unknown = statuses.index("UNKNOWN") if "UNKNOWN" in statuses else -1
+        # batch reads: drain every waiting report per wakeup, so a delayed thread catches up in one pass
+        batch_read = self.scoring_manager.settings.get('batch_read')
+        last_stamp = float('-inf')
+        metrics['connected'].set(1)
+        scorer = self.make_scorer(clock.now())
+        # decode and queue posting are timed separately while profiling (see profiler.py); the
+        # scorer gets timed or plain functions, picked again only when profiling is switched
+        decode, post = scorer.detect_hit_state, scorer.emit
+        profiling = False
+        recorder = start_recording(clock.now(), self.scoring_manager.settings.get('record_dir'))
+
+        # Initial status and health update using ScoringManager
+        self.output_queue.put({'type': 'status', 'message': "Monitoring fencing hits..."})
+        self.output_queue.put({'type': 'status', 'message': "-" * 30})
+        initial_left_hp, initial_right_hp = self.scoring_manager.get_hp()
+        self.output_queue.put({'type': 'health', 'left': initial_left_hp, 'right': initial_right_hp})
+
+        try:
+            while not self.stop_event.is_set():
+                if PROFILER.active != profiling:  # switched on or off (--profile, F9, SIGUSR1)
+                    profiling = PROFILER.active
+                    scorer.detect_hit_state = PROFILER.timed('device.process.decode', decode)
+                    scorer.emit = PROFILER.timed('device.process.post', post)
+                try:
+                    current_time = clock.now()
+                    read_start = perf_counter()
+
+                    # Read data from the device (with a short timeout to allow checking stop_event)
+                    if batch_read:
+                        batch = read_batch(device, REPORT_SIZE, timeout_ms=50, limit=BATCH_READ_MAX)
+                    else:
+                        data = device.read(REPORT_SIZE, timeout_ms=50)
+                        batch = [data] if data else []
+                    read_end = perf_counter()
+                    metrics['read_seconds'].observe(read_end - read_start)
+
+                    if self.stop_event.is_set():
+                        # double check after potential blocking read
+                        break
+
+                    if batch:
+                        if device_clock:
+                            # when the device produced each report, not when this thread got to it
+                            arrival = monotonic()
+                            times = [clock.at(device_clock.stamp(data[0], arrival)) for data in batch]
+                        elif batch_read:
+                            # the last report is the newest; the ones before it waited one interval each
+                            arrival = monotonic()
+                            stamps = [max(arrival - (len(batch) - 1 - i) * REPORT_INTERVAL_SEC, last_stamp)
+                                      for i in range(len(batch))]
+                            last_stamp = stamps[-1]
+                            times = [clock.at(stamp) for stamp in stamps]
+                        else:
+                            times = [current_time]
+                        for data, current_time in zip(batch, times):
+                            if recorder:
+                                recorder.write(current_time, data)
+                            scorer.process(data, current_time)
+                            if len(data) > 3 and (left_codes[data[2]] == unknown or right_codes[data[3]] == unknown):
+                                metrics['unknown'].inc()
+                        metrics['reports'].inc(len(batch))
+                        if batch_read:
+                            metrics['batch_reports'].observe(len(batch))
+                    else:
+                        if device_clock:
+                            current_time = clock.at(device_clock.now(monotonic()))
+                        scorer.process([], current_time)
+                        metrics['read_timeouts'].inc()
+                    process_time = perf_counter() - read_end
+                    metrics['process_seconds'].observe(process_time)
+                    if PROFILER.active:
+                        PROFILER.add('device.read', read_end - read_start)
+                        PROFILER.add('device.process', process_time)
+                except IOError as e:
+                    # Handle device read error (e.g., device disconnected)
+                    metrics['read_errors'].inc()
+                    metrics['connected'].set(0)
+                    if DEVICE_READ_ERROR.enabled:
+                        DEVICE_READ_ERROR.emit()
+                    self.output_queue.put(
+                        {'type': 'status', 'message': f"Device read error: {e}. Attempting to reconnect..."})
+                    if device:
+                        try:
+                            device.close()  # Attempt to close the old device/listener first
+                        except Exception as close_err:
+                            # Log if closing fails, but continue trying to reconnect
+                            print(f"Error closing device during reconnect: {close_err}")
+                    self.current_device = None  # Clear the reference in GUI
+                    device = None  # Local variable in this function
+
+                    # Attempt to find a new device (creates a new instance, dummy or real)
+                    device = wait_for_device(self.find_device, self.stop_event, status=self._status)
+                    self.current_device = device  # Update GUI reference
+
+                    if self.stop_event.is_set():  # Exit if stopped during reconnect attempt
+                        break
+
+                    if not device:  # If still no device after trying, exit loop
+                        self.output_queue.put(
+                            {'type': 'status', 'message': "Failed to reconnect. Stopping monitoring."})
+                        break
+
+                    # Device reconnected, restart the loop
+                    scorer.reset_states()
+                    if device_clock:
+                        device_clock.resync()  # the counter restarts with the device
+                    metrics['reconnects'].inc()
+                    metrics['connected'].set(1)
+                    if DEVICE_RECONNECTED.enabled:
+                        DEVICE_RECONNECTED.emit()
+                    self.output_queue.put({'type': 'status', 'message': "Device reconnected. Resuming monitoring..."})
+        except Exception as e:
+            import traceback
+            print(traceback.format_exc())
+            self.output_queue.put({'type': 'status', 'message': f"Error in device loop: {e}"})
+        finally:
+            self.output_queue.put({'type': 'status', 'message': "Device monitoring stopped."})
+            metrics['connected'].set(0)
+            if device:
+                device.close()
+            if recorder:
+                recorder.close()
@@ -0,0 +1,93 @@
+import os
+import re
+from datetime import datetime, timedelta
+from itertools import count
+
+# Captures are the text logs printed by testing/device.py, e.g.
+#   2025-04-07 15:47:44.618108 Raw data changed: [188, 0, 0, 64, 0, 64, ...]
+# Other lines (Manufacturer:, Data length changed:, bare report lengths) are ignored.
+CAPTURE_LINE = re.compile(
+    r'^(?P<time>\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)?) Raw data(?: changed)?: \[(?P<data>[\d,\s]*)\]'
+)
+
+
+def parse_capture_line(line):
+    """Returns (datetime, [bytes...]) for a report line, or None for anything else."""
+    match = CAPTURE_LINE.match(line.strip())
+    if not match:
+        return None
+    when = datetime.fromisoformat(match.group('time'))
+    data = [int(b) for b in match.group('data').split(',') if b.strip()]
+    return when, data
+
+
+def iter_capture(path):
+    """Yields (datetime, data) for every report in a capture file, in file order."""
+    with open(path) as f:
+        for line in f:
+            report = parse_capture_line(line)
+            if report is not None:
+                yield report
+
+
+def read_capture(path):
+    """Loads a whole capture as a list of (datetime, data)."""
+    return list(iter_capture(path))
+
+
+def format_capture_line(when: datetime, data):
+    """Formats one report the same way testing/device.py prints it."""
+    return f"{when} Raw data: {list(data)}"
+
+
+def list_captures(directory):
+    """Capture files in a directory (non-recursive), sorted by name."""
+    names = sorted(n for n in os.listdir(directory) if not n.startswith('.'))
+    return [os.path.join(directory, n) for n in names if os.path.isfile(os.path.join(directory, n))]
+
+
+def fill_gaps(reports, interval=0.01):
+    """
+    testing/device.py only logs reports that changed. Scoring needs the steady report stream the
+    device really sent (continuous damage accrues per report), so repeat the last report every
+    `interval` seconds across any longer gap. Full recordings (--record) pass through unchanged.
+    """
+    filled = []
+    for i, (when, data) in enumerate(reports):
+        filled.append((when, data))
+        if i + 1 < len(reports):
+            gap = (reports[i + 1][0] - when).total_seconds()
+            steps = int(gap / interval)
+            if gap > interval * 1.5:
+                filled.extend((when + timedelta(seconds=interval * k), data) for k in range(1, steps))
+    return filled
+
+
+class CaptureWriter:
+    """Records every report the device loop reads, in the testing/device.py format."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', buffering=64 * 1024)
+
+    def write(self, when: datetime, data):
+        if data:
+            self._file.write(format_capture_line(when, data))
+            self._file.write('\n')
+
+    def close(self):
+        self._file.close()
+
+
+# python main.py --record DIR writes every report the device loop reads to DIR (the 'record_dir'
+# setting), one file per device session, for re-scoring later (see rescore.py)
+_recording_ids = count(1)
+
+
+def start_recording(start_time: datetime, record_dir):
+    """A CaptureWriter for a new device session in record_dir, or None when not recording."""
+    if not record_dir:
+        return None
+    os.makedirs(record_dir, exist_ok=True)
+    name = f"bout-{start_time:%Y%m%d-%H%M%S}-{os.getpid()}-{next(_recording_ids)}.log"
+    return CaptureWriter(os.path.join(record_dir, name))
@@ -0,0 +1,468 @@
+import os
+import sys
+import time
+import random
+import socket
+from abc import ABC, abstractmethod
+from threading import Thread, Condition, Lock, local
+from gui_src.capture import read_capture
+from gui_src.settings import (
+    ENUMERATION_CACHE_SEC,
+    RECONNECT_BACKOFF_INITIAL_SEC,
+    RECONNECT_BACKOFF_MAX_SEC,
+    RECONNECT_BACKOFF_FACTOR,
+)
+
+# Vendor ID and Product ID for the VSM device
+VSM_VENDOR_ID = 0x04bc
+VSM_PRODUCT_ID = 0xc001
+REPORT_SIZE = 42
+
+
+# ---------------------------------------------------------------------------
+# Backend registry
+# ---------------------------------------------------------------------------
+
+BACKENDS = {}
+
+
+def register_backend(name):
+    """Class decorator: makes a backend available as `--backend <name>`."""
+    def decorator(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def get_backend(name, **options):
+    try:
+        return BACKENDS[name](**options)
+    except KeyError:
+        raise ValueError(f"Unknown device backend '{name}'. Available: {', '.join(sorted(BACKENDS))}")
+
+
+class DeviceBackend(ABC):
+    """
+    A source of VSM-style devices. enumerate() lists what's available right now,
+    open() returns an object with read(size, timeout_ms) and close() like hid.device.
+    read(size, timeout_ms=0) must not block: it returns [] when no report is waiting.
+    """
+    name = None
+    hotplug = False  # True if devices come and go with USB events (so the hot-plug monitor matters)
+
+    def __init__(self, **options):
+        self.options = options
+        self._cache = None
+        self._cache_time = 0.0
+        self._cache_generation = -1
+        self._cache_lock = Lock()
+        self._bound = {}  # strip index -> identity of the box it opened first, see open_index
+        self._missing = {}  # strip index -> attempts in a row its box wasn't there
+        self._bound_lock = Lock()
+
+    @abstractmethod
+    def _enumerate(self):
+        """Lists the ids of the devices available right now (uncached)."""
+
+    def enumerate(self):
+        """
+        Cached device list, so several strips waiting for devices share one enumeration.
+        The cache is dropped on every hot-plug event; when hot-plug events aren't available
+        it also expires after ENUMERATION_CACHE_SEC.
+        """
+        with self._cache_lock:
+            now = time.monotonic()
+            expired = (not (self.hotplug and hotplug_monitor.event_driven)
+                       and now - self._cache_time > ENUMERATION_CACHE_SEC)
+            if self._cache is None or self._cache_generation != hotplug_monitor.generation or expired:
+                self._cache = self._enumerate()
+                self._cache_time = now
+                self._cache_generation = hotplug_monitor.generation
+            return list(self._cache)
+
+    @abstractmethod
+    def open(self, device_id):
+        """Opens one of the ids from enumerate() (see the class docstring for what it returns)."""
+
+    def identity(self, device_id):
+        """What a strip is bound to: something that stays with the box when it's replugged."""
+        return device_id
+
+    def open_index(self, index=None):
+        """
+        Opens the device of strip `index` (or the first device when index is None). Returns None
+        if it isn't there.
+
+        A strip's first device is the index-th one in enumeration order. From then on the strip
+        is bound to that box (see identity()) and reconnects to it, so unplugging one strip's box
+        never moves later strips onto their neighbours' boxes. A strip whose index-th device
+        belongs to another strip takes the first device no strip has. So does a bound strip
+        whose box is still missing on the next attempt (one backoff delay later), e.g. one that
+        came back on a different USB port with no serial number to recognise it by.
+        """
+        _last_miss.reason = None
+        device_ids = self.enumerate()
+        if index is None:
+            device_id = device_ids[0] if device_ids else None
+        else:
+            with self._bound_lock:
+                identities = {self.identity(d): d for d in device_ids}
+                taken = set(self._bound.values())
+                free = [d for d in device_ids if self.identity(d) not in taken]
+                bound = self._bound.get(index)
+                if bound is None:
+                    if index < len(device_ids) and device_ids[index] in free:
+                        device_id = device_ids[index]
+                    elif index < len(device_ids):
+                        device_id = free[0] if free else None
+                    else:
+                        device_id = None
+                elif bound in identities:
+                    device_id = identities[bound]
+                    self._missing.pop(index, None)
+                else:
+                    missed = self._missing[index] = self._missing.get(index, 0) + 1
+                    device_id = free[0] if missed > 1 and free else None
+                    if device_id is None:
+                        _last_miss.reason = f"Waiting for this strip's device ({bound}) to come back..."
+        if device_id is None or device_id not in device_ids:
+            return None
+        try:
+            device = self.open(device_id)
+        except IOError:
+            with self._cache_lock:
+                self._cache = None  # probably unplugged since we enumerated
+            return None
+        if index is not None:
+            with self._bound_lock:
+                self._bound[index] = self.identity(device_id)
+                self._missing.pop(index, None)
+        return device
+
+
+@register_backend("hid")
+class HidBackend(DeviceBackend):
+    """Real VSM boxes over USB HID."""
+    hotplug = True
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self._serials = {}  # path -> serial number, for the paths of the last enumeration
+
+    def _enumerate(self):
+        import hid  # imported lazily, see startup.py
+        devices = hid.enumerate(VSM_VENDOR_ID, VSM_PRODUCT_ID)
+        serials = [d.get('serial_number') for d in devices]
+        # a serial number only identifies a box if no other box has the same one (or none)
+        self._serials = {d['path']: s for d, s in zip(devices, serials) if s and serials.count(s) == 1}
+        # ordered by path so each strip keeps the same index across restarts
+        return sorted(d['path'] for d in devices)
+
+    def identity(self, device_id):
+        """The box's serial number when it has a unique one, else its path (i.e. its USB port)."""
+        serial = self._serials.get(device_id)
+        if serial:
+            return f"serial {serial}"
+        return device_id.decode(errors='replace') if isinstance(device_id, bytes) else device_id
+
+    def open(self, device_id):
+        import hid
+        device = hid.device()
+        device.open_path(device_id)
+        # timed reads (timeout_ms > 0) still wait; untimed ones return [] when nothing is buffered
+        device.set_nonblocking(1)
+        print(f"Manufacturer: {device.get_manufacturer_string()}")
+        print(f"Product: {device.get_product_string()}")
+        return device
+
+
+@register_backend("dummy")
+class DummyBackend(DeviceBackend):
+    """Keyboard-driven fake device (l / r keys), see dummy.py."""
+
+    def _enumerate(self):
+        return ["keyboard"]
+
+    def open(self, device_id):
+        from dummy import find_dummy_device
+        return find_dummy_device()
+
+
+class ReplayDevice:
+    """Plays back a capture file at its recorded pace (or faster with speed > 1)."""
+
+    def __init__(self, reports, speed=1.0, report_interval=0.01):
+        if not reports:
+            raise IOError("Capture has no reports")
+        self.reports = reports
+        self.speed = speed
+        self.report_interval = report_interval
+        self._start = time.monotonic()
+        self._index = 0
+
+    def read(self, size, timeout_ms=None):
+        if timeout_ms == 0:
+            return []  # plays the latest report at the replay clock, nothing is ever buffered
+        time.sleep(self.report_interval / self.speed)
+        elapsed = (time.monotonic() - self._start) * self.speed
+        first_time = self.reports[0][0]
+        # advance to the last report recorded at or before the replay clock
+        while (self._index + 1 < len(self.reports)
+               and (self.reports[self._index + 1][0] - first_time).total_seconds() <= elapsed):
+            self._index += 1
+        data = list(self.reports[self._index][1][:size])
+        return data + [0] * (size - len(data))
+
+    def close(self):
+        return
+
+
+@register_backend("replay")
+class ReplayBackend(DeviceBackend):
+    """Replays a recorded capture (testing/device.py output). Options: capture=<path>, speed=<float>."""
+
+    def _enumerate(self):
+        capture = self.options.get('capture')
+        return [capture] if capture and os.path.exists(capture) else []
+
+    def open(self, device_id):
+        return ReplayDevice(read_capture(device_id), speed=float(self.options.get('speed', 1.0)))
+
+
+class SimulatedDevice:
+    """
+    Generates a random bout: neutral with occasional touches, self-hits and blade contact.
+    Reports are produced every report_interval whether or not anyone reads them; like the real
+    box, up to BACKLOG of them wait to be read and older ones are lost (the counter skips).
+    """
+
+    LEFT_CODES = {'normal': 4, 'hit': 44, 'self': 38, 'weapons': 20}
+    RIGHT_CODES = {'normal': 80, 'hit': 114, 'self': 120, 'weapons': 84}
+    BACKLOG = 32
+
+    def __init__(self, seed=None, touch_rate=0.3, report_interval=0.01):
+        self.random = random.Random(seed)
+        self.touch_rate = touch_rate  # touches per second
+        self.report_interval = report_interval
+        self.counter = 0
+        self.left, self.right = 'normal', 'normal'
+        self.left_until = self.right_until = 0.0
+        self._due = None  # when the next report is produced
+
+    def read(self, size, timeout_ms=None):
+        now = time.monotonic()
+        if self._due is None:
+            self._due = now
+        oldest = now - self.BACKLOG * self.report_interval
+        if self._due < oldest:
+            lost = int((oldest - self._due) / self.report_interval) + 1
+            self._due += lost * self.report_interval
+            self.counter = (self.counter + lost) % 256
+        if self._due > now:
+            if timeout_ms == 0:
+                return []
+            time.sleep(self._due - now)
+        now = self._due  # the report's own time, earlier than now if it waited in the backlog
+        self._due += self.report_interval
+        if self.left != 'normal' and now >= self.left_until:
+            self.left = 'normal'
+        if self.right != 'normal' and now >= self.right_until:
+            self.right = 'normal'
+        if self.random.random() < self.touch_rate * self.report_interval:
+            action = self.random.choice(['hit', 'hit', 'hit', 'self', 'weapons'])
+            duration = self.random.uniform(0.05, 1.0)
+            if self.random.random() < 0.5:
+                self.left, self.left_until = action, now + duration
+            else:
+                self.right, self.right_until = action, now + duration
+
+        self.counter = (self.counter + 1) % 256
+        data = [self.counter, 0] + [self.LEFT_CODES[self.left], self.RIGHT_CODES[self.right]] * 20
+        data = data[:size]
+        return data + [0] * (size - len(data))
+
+    def close(self):
+        return
+
+
+@register_backend("sim")
+class SimulatorBackend(DeviceBackend):
+    """Random bout generator for soak-testing the GUI. Options: seed=<int>, strips=<count>."""
+
+    def _enumerate(self):
+        return [f"sim{i}" for i in range(int(self.options.get('strips', 16)))]
+
+    def open(self, device_id):
+        seed = self.options.get('seed')
+        return SimulatedDevice(seed=None if seed is None else f"{seed}-{device_id}")
+
+
+class NetworkDevice:
+    """Raw 42-byte VSM reports streamed over TCP (e.g. from a reader on another machine)."""
+
+    def __init__(self, address):
+        host, port = address.rsplit(':', 1)
+        self.sock = socket.create_connection((host, int(port)), timeout=2.0)
+        self._buffer = b""
+
+    def read(self, size, timeout_ms=None):
+        if timeout_ms == 0:
+            self.sock.setblocking(False)  # only what has already arrived
+        else:
+            self.sock.settimeout(timeout_ms / 1000 if timeout_ms else None)
+        try:
+            while len(self._buffer) < size:
+                chunk = self.sock.recv(4096)
+                if not chunk:
+                    raise IOError("Network device closed the connection")
+                self._buffer += chunk
+        except (socket.timeout, BlockingIOError):
+            return []
+        except OSError as e:
+            raise IOError(e)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return list(data)
+
+    def close(self):
+        self.sock.close()
+
+
+@register_backend("network")
+class NetworkBackend(DeviceBackend):
+    """Options: address=host:port (comma separated for several strips)."""
+
+    def _enumerate(self):
+        return [a for a in self.options.get('address', '').split(',') if a]
+
+    def open(self, device_id):
+        try:
+            return NetworkDevice(device_id)
+        except OSError as e:
+            raise IOError(e)
+
+
+def read_batch(device, size=REPORT_SIZE, timeout_ms=50, limit=64):
+    """
+    Every report the device has waiting, oldest first: waits up to timeout_ms for the first one,
+    then drains the rest with non-blocking reads, at most `limit`. [] if the wait timed out.
+    """
+    data = device.read(size, timeout_ms=timeout_ms)
+    if not data:
+        return []
+    batch = [data]
+    while len(batch) < limit:
+        data = device.read(size, timeout_ms=0)
+        if not data:
+            break
+        batch.append(data)
+    return batch
+
+
+# ---------------------------------------------------------------------------
+# Hot-plug detection
+# ---------------------------------------------------------------------------
+
+class HotplugMonitor:
+    """
+    Wakes up threads waiting for a device when something is plugged in or removed.
+    On Linux it listens to kernel uevents on a netlink socket (no polling, no extra dependency).
+    Everywhere else - or if netlink isn't available - waiters just time out on their backoff.
+    `generation` increases on every event; the enumeration caches key off it.
+    """
+
+    NETLINK_KOBJECT_UEVENT = 15
+    SUBSYSTEMS = (b"SUBSYSTEM=hidraw", b"SUBSYSTEM=usb")
+
+    def __init__(self):
+        self.generation = 0
+        self.event_driven = False
+        self._condition = Condition()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None or not sys.platform.startswith("linux"):
+            return
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, self.NETLINK_KOBJECT_UEVENT)
+            sock.bind((os.getpid(), 1))  # group 1 = kernel uevents
+        except (OSError, AttributeError) as e:
+            print(f"Hot-plug events unavailable ({e}), falling back to polling")
+            return
+        self.event_driven = True
+        self._thread = Thread(target=self._listen, args=(sock,), daemon=True)
+        self._thread.start()
+        # event-driven caches no longer expire: drop any filled before we were listening, or a
+        # device plugged in before the socket was bound would stay invisible until the next event
+        self.notify()
+
+    def _listen(self, sock):
+        while True:
+            try:
+                message = sock.recv(8192)
+            except OSError:
+                self.event_driven = False
+                return
+            header = message.split(b"\0", 1)[0]
+            if not (header.startswith(b"add@") or header.startswith(b"remove@")):
+                continue
+            if any(s in message for s in self.SUBSYSTEMS):
+                self.notify()
+
+    def notify(self):
+        with self._condition:
+            self.generation += 1
+            self._condition.notify_all()
+
+    def wait(self, timeout):
+        """Blocks until the next hot-plug event or timeout. Returns True if an event happened."""
+        with self._condition:
+            generation = self.generation
+            self._condition.wait_for(lambda: self.generation != generation, timeout=timeout)
+            return self.generation != generation
+
+
+hotplug_monitor = HotplugMonitor()
+
+
+class Backoff:
+    """Delays between reconnect attempts: initial, initial*factor, ... capped at maximum."""
+
+    def __init__(self, initial=RECONNECT_BACKOFF_INITIAL_SEC, maximum=RECONNECT_BACKOFF_MAX_SEC,
+                 factor=RECONNECT_BACKOFF_FACTOR):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.delay = initial
+
+    def next(self):
+        delay = self.delay
+        self.delay = min(self.delay * self.factor, self.maximum)
+        return delay
+
+
+_last_miss = local()  # why open_index last returned None on this thread, for wait_for_device
+
+
+def wait_for_device(find_device, stop_event, backoff=None, status=None):
+    """
+    Calls find_device until it returns a device or stop_event is set.
+    Between attempts it sleeps on the hot-plug monitor, so a cable plugged back in is picked
+    up immediately when events are available, and within the backoff delay otherwise.
+    status(message) is called when the reason it's still waiting changes (e.g. a strip waiting
+    for its own box).
+    """
+    hotplug_monitor.start()
+    backoff = backoff or Backoff()
+    shown = None
+    device = find_device()
+    while not device and not stop_event.is_set():
+        reason = getattr(_last_miss, 'reason', None)
+        if status and reason and reason != shown:
+            status(reason)
+        shown = reason
+        if hotplug_monitor.wait(backoff.next()):
+            # something was plugged in: retry quickly, the device node may need a moment
+            backoff.delay = backoff.initial
+        device = find_device()
+    return device
@@ -0,0 +1,150 @@
+from abc import ABC, abstractmethod
+from gui_src.devices import REPORT_SIZE
+
+# Each report carries 20 (left, right) code pairs in bytes 2..41. data[2] / data[3] is the newest
+# sample, the later pairs are older ones still propagating through the box (see
+# testing/states/explanation.md). detect_hit_state only looks at the newest pair, so a single
+# flickering sample (80 -> 64 -> 80 in testing/unknowntorightneutral) becomes two spurious
+# transitions - which also reset the state-change time that gates continuous damage.
+#
+# A state filter sits between the decode and the scorer and looks at all 20 samples:
+#   majority    - the status most samples agree on
+#   hysteresis  - only leave the current status once `state_filter_votes` samples agree on a new one
+#   min_run     - only take the newest status once it fills the newest `state_filter_run` samples
+#
+# The codes are decoded with one bytes.translate() per side through a 256-entry table built from
+# detect_hit_state itself (so the filter can never disagree with it), and votes are counted with
+# bytes.count(), so the whole report is handled in C.
+
+FILTERS = {}
+
+
+def register_filter(name):
+    """Class decorator: makes a filter available as the `state_filter` setting."""
+    def decorator(cls):
+        cls.name = name
+        FILTERS[name] = cls
+        return cls
+    return decorator
+
+
+_decode_tables = {}
+
+
+def decode_tables(detect_hit_state):
+    """
+    (statuses, left_table, right_table): each table maps a code byte to an index into statuses.
+    Built by running detect_hit_state on every code, once per decoder.
+    """
+    if detect_hit_state not in _decode_tables:
+        statuses = []
+
+        def index(status):
+            if status not in statuses:
+                statuses.append(status)
+            return statuses.index(status)
+
+        neutral_left, neutral_right = 4, 80
+        left = bytes(index(detect_hit_state([0, 0, code, neutral_right])[0]) for code in range(256))
+        right = bytes(index(detect_hit_state([0, 0, neutral_left, code])[1]) for code in range(256))
+        _decode_tables[detect_hit_state] = (statuses, left, right)
+    return _decode_tables[detect_hit_state]
+
+
+class StateFilter(ABC):
+    """
+    Drop-in replacement for detect_hit_state: call it with a report, get (left, right) statuses.
+    Keeps the filtered state of both sides, so make a new one per bout (see make_detector).
+    """
+    name = None
+
+    def __init__(self, detect_hit_state, settings):
+        self.detect_hit_state = detect_hit_state
+        self.statuses, left_table, right_table = decode_tables(detect_hit_state)
+        self.tables = (left_table, right_table)
+        self.unknown = self.statuses.index("UNKNOWN") if "UNKNOWN" in self.statuses else None
+        self.state = [None, None]  # filtered status index per side
+
+    def __call__(self, data):
+        if len(data) < REPORT_SIZE:
+            return self.detect_hit_state(data)
+        pairs = bytes(data[2:REPORT_SIZE])
+        left = self._filter(0, pairs[0::2].translate(self.tables[0]))
+        right = self._filter(1, pairs[1::2].translate(self.tables[1]))
+        return self.statuses[left], self.statuses[right]
+
+    @abstractmethod
+    def _filter(self, side, samples):
+        """samples: one status index per sub-sample, newest first. Returns the filtered status index."""
+
+    def _votes(self, samples):
+        votes = [samples.count(i) for i in range(len(self.statuses))]
+        if self.unknown is not None and votes[self.unknown] < len(samples):
+            votes[self.unknown] = 0  # undecodable samples don't vote unless there's nothing else
+        return votes
+
+    def _majority(self, side, samples, votes):
+        """Most voted status; ties go to the current status, then to the newest sample."""
+        top = max(votes)
+        current = self.state[side]
+        if current is not None and votes[current] == top:
+            return current
+        if votes[samples[0]] == top:
+            return samples[0]
+        return votes.index(top)
+
+
+@register_filter("majority")
+class MajorityFilter(StateFilter):
+
+    def _filter(self, side, samples):
+        if samples.count(samples[0]) > len(samples) // 2:
+            choice = samples[0]  # the common case: a clear majority for the newest sample
+        else:
+            choice = self._majority(side, samples, self._votes(samples))
+        self.state[side] = choice
+        return choice
+
+
+@register_filter("hysteresis")
+class HysteresisFilter(StateFilter):
+
+    def __init__(self, detect_hit_state, settings):
+        super().__init__(detect_hit_state, settings)
+        self.votes_needed = int(settings.get('state_filter_votes', 14))
+
+    def _filter(self, side, samples):
+        current = self.state[side]
+        if current is not None and samples.count(current) == len(samples):
+            return current  # steady state
+        votes = self._votes(samples)
+        best = self._majority(side, samples, votes)
+        if current is None or votes[current] == 0 or votes[best] >= self.votes_needed:
+            self.state[side] = best
+        return self.state[side]
+
+
+@register_filter("min_run")
+class MinRunFilter(StateFilter):
+
+    def __init__(self, detect_hit_state, settings):
+        super().__init__(detect_hit_state, settings)
+        self.run_needed = int(settings.get('state_filter_run', 5))
+
+    def _filter(self, side, samples):
+        newest = samples[0]
+        run = len(samples) - len(samples.lstrip(samples[:1]))
+        if run >= self.run_needed or self.state[side] is None:
+            self.state[side] = newest
+        return self.state[side]
+
+
+def make_detector(detect_hit_state, settings):
+    """detect_hit_state wrapped in the filter named by settings['state_filter'] (unchanged if none)."""
+    name = settings.get('state_filter')
+    if not name:
+        return detect_hit_state
+    try:
+        return FILTERS[name](detect_hit_state, settings)
+    except KeyError:
+        raise ValueError(f"Unknown state filter '{name}'. Available: {', '.join(sorted(FILTERS))}")
@@ -0,0 +1,130 @@
+import time
+from collections import deque
+from gui_src.metrics import REGISTRY
+from gui_src.profiler import PROFILER
+from gui_src.settings import IDLE_POLL_SEC
+
+
+class FrameStats:
+    """Rolling frame-time statistics for the render loop."""
+
+    def __init__(self, window=300):
+        self.frames_painted = 0
+        self.frames_idle = 0
+        self.paint_times = deque(maxlen=window)  # seconds spent painting, painted frames only
+        self.frame_intervals = deque(maxlen=window)  # seconds between consecutive frame starts
+        self.max_paint_time = 0.0
+        self._last_frame_start = None
+
+    def record(self, frame_start, paint_time, painted):
+        if self._last_frame_start is not None:
+            self.frame_intervals.append(frame_start - self._last_frame_start)
+        self._last_frame_start = frame_start
+        if painted:
+            self.frames_painted += 1
+            self.paint_times.append(paint_time)
+            self.max_paint_time = max(self.max_paint_time, paint_time)
+        else:
+            self.frames_idle += 1
+
+    def snapshot(self):
+        """Returns the current stats as a dict (times in ms)."""
+        paint = sorted(self.paint_times)
+        intervals = list(self.frame_intervals)
+        return {
+            'frames_painted': self.frames_painted,
+            'frames_idle': self.frames_idle,
+            'paint_ms_avg': 1000 * sum(paint) / len(paint) if paint else 0.0,
+            'paint_ms_p95': 1000 * paint[int(len(paint) * 0.95)] if paint else 0.0,
+            'paint_ms_max': 1000 * self.max_paint_time,
+            'frame_interval_ms_avg': 1000 * sum(intervals) / len(intervals) if intervals else 0.0,
+            'frame_interval_ms_max': 1000 * max(intervals) if intervals else 0.0,
+        }
+
+    def summary(self):
+        s = self.snapshot()
+        return (f"frames: {s['frames_painted']} painted, {s['frames_idle']} idle | "
+                f"paint avg {s['paint_ms_avg']:.2f}ms p95 {s['paint_ms_p95']:.2f}ms max {s['paint_ms_max']:.2f}ms | "
+                f"interval avg {s['frame_interval_ms_avg']:.1f}ms max {s['frame_interval_ms_max']:.1f}ms")
+
+
+class FrameScheduler:
+    """
+    Single render loop for the Tk thread.
+    Every frame it calls `poll` (which drains incoming events and marks regions dirty),
+    then repaints only the dirty regions, in registration order. A region's paint
+    function can return True to be repainted next frame too (used for animations).
+    While nothing is dirty or animating it only polls every `idle_interval` seconds;
+    mark_dirty() brings the next frame forward.
+    """
+
+    def __init__(self, root, target_fps=30, poll=None, idle_interval=IDLE_POLL_SEC):
+        self.root = root
+        self.poll = poll
+        self.stats = FrameStats()
+        self._poll_seconds = REGISTRY.histogram('gui_update_seconds', "Time draining the device queues per frame")
+        self._frame_seconds = REGISTRY.histogram('gui_frame_seconds', "Time per frame, update and paint")
+        self._painters = {}  # region name -> paint function, insertion order = paint order
+        self._dirty = set()
+        self._job = None
+        self._idle = False  # True while the next frame is an idle poll
+        self.idle_interval = idle_interval
+        self.set_target_fps(target_fps)
+
+    def set_target_fps(self, target_fps):
+        self.target_fps = max(1, target_fps)
+        self.frame_interval = 1.0 / self.target_fps
+
+    def add_region(self, name, paint):
+        self._painters[name] = paint
+
+    def mark_dirty(self, name):
+        self._dirty.add(name)
+        if self._idle:
+            # e.g. a click or a settings change between idle polls: paint it now
+            self.root.after_cancel(self._job)
+            self._idle = False
+            self._job = self.root.after(0, self._frame)
+
+    def start(self):
+        if self._job is None:
+            self._job = self.root.after(0, self._frame)
+
+    def stop(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+            self._idle = False
+
+    def _frame(self):
+        frame_start = time.perf_counter()
+        self._idle = False  # regions marked dirty while polling are painted below
+        if self.poll:
+            self.poll()
+            poll_time = time.perf_counter() - frame_start
+            self._poll_seconds.observe(poll_time)
+            if PROFILER.active:
+                PROFILER.add('gui.update', poll_time)
+
+        painted = False
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            for name, paint in self._painters.items():
+                if name in dirty:
+                    if paint():
+                        self._dirty.add(name)  # still animating, paint again next frame
+                    painted = True
+        paint_time = time.perf_counter() - frame_start
+        self.stats.record(frame_start, paint_time, painted)
+        self._frame_seconds.observe(paint_time)
+        if PROFILER.active:
+            PROFILER.add('gui.frame', paint_time)
+
+        if self._dirty:
+            # keep the frame cadence steady: subtract the time this frame already took
+            delay_ms = max(1, int((self.frame_interval - paint_time) * 1000))
+        else:
+            # nothing to animate: just keep draining the queues
+            self._idle = True
+            delay_ms = max(1, int(self.idle_interval * 1000))
+        self._job = self.root.after(delay_ms, self._frame)
@@ -0,0 +1,188 @@
+# Live metrics for the scorer: reports read, read latency, decode UNKNOWNs, reconnects,
+# output_queue depth, GUI frame time... one set per strip, so on a 16-strip floor the
+# struggling one stands out.
+#
+#     python main.py --metrics-port 9100        # http://127.0.0.1:9100/metrics (Prometheus text)
+#                                               # http://127.0.0.1:9100/metrics.json
+#     python main.py --metrics-file metrics.json  # snapshot rewritten every METRICS_SNAPSHOT_SEC
+#
+# main.py starts the exporters (serve / write_snapshots); importing this module starts nothing.
+#
+# Every metric has a single writer thread (a strip's device thread, or the Tk thread), so
+# updates are plain attribute increments with no locking; readers only ever see a value that is
+# a few updates stale. Gauges that are cheap to read on demand (queue depth) are callbacks,
+# evaluated only when someone looks.
+import os
+import sys
+import json
+import time
+import threading
+from bisect import bisect_left
+from gui_src.settings import METRICS_SNAPSHOT_SEC
+
+# seconds, for read latency / frame time / update_gui
+LATENCY_BUCKETS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+class Counter:
+    kind = 'counter'
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+    def read(self):
+        return self.value
+
+
+class Gauge:
+    kind = 'gauge'
+    __slots__ = ('value', 'function')
+
+    def __init__(self, function=None):
+        self.value = 0
+        self.function = function  # if set, read() calls it instead of returning value
+
+    def set(self, value):
+        self.value = value
+
+    def read(self):
+        return self.function() if self.function else self.value
+
+
+class Histogram:
+    """Fixed buckets: counts[i] = observations <= buckets[i] (and > buckets[i-1]); the last is +Inf."""
+    kind = 'histogram'
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def read(self):
+        return {'buckets': list(self.buckets), 'counts': list(self.counts), 'sum': self.sum, 'count': self.count}
+
+
+class Registry:
+    """Metrics by (name, labels). Asking for an existing one returns it, so restarts keep counting."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._lock = threading.Lock()  # registration only
+
+    def _get(self, cls, name, help, labels, *args):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(*args)
+                self._help.setdefault(name, help)
+            return metric
+
+    def counter(self, name, help='', **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help='', function=None, **labels):
+        gauge = self._get(Gauge, name, help, labels)
+        if function is not None:
+            gauge.function = function  # latest owner wins, e.g. a restarted pipeline's queue
+        return gauge
+
+    def histogram(self, name, help='', buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets)
+
+    def snapshot(self):
+        """{name: [{'labels': {...}, 'value': ...}, ...]} for JSON output."""
+        with self._lock:
+            items = list(self._metrics.items())
+        result = {}
+        for (name, labels), metric in items:
+            result.setdefault(name, []).append({'labels': dict(labels), 'type': metric.kind, 'value': metric.read()})
+        return result
+
+    def prometheus(self):
+        """The metrics in Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(self._metrics.items(), key=lambda item: item[0])
+        lines, described = [], set()
+        for (name, labels), metric in items:
+            if name not in described:
+                described.add(name)
+                if self._help.get(name):
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            braces = f"{{{label_text}}}" if label_text else ""
+            value = metric.read()
+            if metric.kind != 'histogram':
+                lines.append(f"{name}{braces} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip([*value['buckets'], '+Inf'], value['counts']):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text}{"," if label_text else ""}le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{braces} {value['sum']}")
+            lines.append(f"{name}_count{braces} {value['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def serve(port, registry=REGISTRY, host='127.0.0.1'):
+    """Serves /metrics and /metrics.json on a daemon thread. Returns the server."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = registry.prometheus().encode(), 'text/plain; version=0.0.4'
+            elif self.path == '/metrics.json':
+                body, content_type = json.dumps(registry.snapshot()).encode(), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            return  # no per-scrape console output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def write_snapshots(path, interval=METRICS_SNAPSHOT_SEC, registry=REGISTRY):
+    """Rewrites path with a JSON snapshot every interval seconds, on a daemon thread."""
+
+    def run():
+        last_error = None
+        while True:
+            tmp = path + '.tmp'
+            try:
+                with open(tmp, 'w') as f:
+                    json.dump({'time': time.time(), 'metrics': registry.snapshot()}, f)
+                os.replace(tmp, path)  # readers never see a half-written file
+                last_error = None
+            except OSError as e:  # disk full, directory gone...: keep trying, say so once
+                if str(e) != last_error:
+                    print(f"Can't write metrics to {path}: {e}", file=sys.stderr)
+                    last_error = str(e)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="metrics-snapshot", daemon=True).start()
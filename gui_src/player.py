@@ -1,5 +1,8 @@
 from datetime import timedelta, datetime
 from typing import Optional, Tuple
+from gui_src.telemetry import event, WARNING
+
+MISSING_CHANGE_TIME = event("missing_state_change_time", WARNING, "side")
 
 
 class ScoringManager:
@@ -50,7 +53,8 @@ class ScoringManager:
                 if (current_time - time_last_change_left).total_seconds() < sec_before_cont_dmg:
                     return False
             else:
-                print("WARNING: time_last_change_left was None")
+                if MISSING_CHANGE_TIME.enabled:
+                    MISSING_CHANGE_TIME.emit(0)
             if self.right_hp > 0:
                 self.right_hp = max(0, self.right_hp - damage_increment)
                 hp_changed = True
@@ -61,7 +65,8 @@ class ScoringManager:
                 if (current_time - time_last_change_right).total_seconds() < sec_before_cont_dmg:
                     return False
             else:
-                print("WARNING: time_last_change_right was None")
+                if MISSING_CHANGE_TIME.enabled:
+                    MISSING_CHANGE_TIME.emit(1)
             if self.left_hp > 0:
                 self.left_hp = max(0, self.left_hp - damage_increment)
                 hp_changed = True
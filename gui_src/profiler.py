@@ -0,0 +1,158 @@
+# Opt-in profiling for "the device thread is falling behind - why?"
+#
+#     python main.py --profile          # on from the start
+#     F9 in the window, or kill -USR1 <pid>, toggles it during a bout
+#
+# While on, it records:
+#   - timing spans around the device loop stages (read, decode, scoring, posting to the GUI
+#     queue) and the GUI frame (update_gui, paint): count, total and max per stage
+#   - thread stacks sampled every PROFILE_SAMPLE_SEC, as collapsed stacks for flamegraph.pl /
+#     speedscope
+#   - how late the sampler itself wakes up: with nothing else running that's the time spent
+#     waiting for the GIL, so a large value points at contention between the Tk and device threads
+# Turning it off (or exiting) writes profile-<time>.collapsed and profile-<time>.txt to
+# PROFILE_DIR and prints the stage totals.
+#
+# When off, each instrumented stage costs one attribute check. main.py starts it for --profile.
+import os
+import sys
+import time
+import atexit
+import threading
+from collections import Counter
+from datetime import datetime
+from gui_src.settings import PROFILE_SAMPLE_SEC, PROFILE_DIR
+
+
+class Profiler:
+
+    def __init__(self, sample_interval=PROFILE_SAMPLE_SEC, output_dir=PROFILE_DIR):
+        self.active = False
+        self.sample_interval = sample_interval
+        self.output_dir = output_dir
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._reset()
+
+    def _reset(self):
+        self.spans = {}  # stage -> [count, total seconds, max seconds]
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+
+    def add(self, stage, seconds):
+        """
+        Records one span. Callers check `active` first so a disabled profiler costs nothing.
+        Unlocked: two device threads adding to the same stage can rarely lose a count.
+        """
+        span = self.spans.get(stage)
+        if span is None:
+            span = self.spans.setdefault(stage, [0, 0.0, 0.0])
+        span[0] += 1
+        span[1] += seconds
+        if seconds > span[2]:
+            span[2] = seconds
+
+    def timed(self, stage, function):
+        """
+        function wrapped so its calls are recorded as `stage`, or function itself when the
+        profiler is off. Callers pick again when `active` changes, so an unprofiled call never
+        goes through an extra frame.
+        """
+        if not self.active:
+            return function
+
+        def wrapper(*args):
+            if not self.active:
+                return function(*args)
+            start = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return wrapper
+
+    # -- on / off ------------------------------------------------------------
+
+    def start(self):
+        with self._lock:
+            if self.active:
+                return
+            self._reset()
+            self.active = True
+            self._sampler = threading.Thread(target=self._sample, name="profiler", daemon=True)
+            self._sampler.start()
+        print("Profiling on")
+
+    def stop(self):
+        with self._lock:
+            if not self.active:
+                return
+            self.active = False
+            sampler, self._sampler = self._sampler, None
+        sampler.join(timeout=1.0)
+        self.report()
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    # -- stack sampling ------------------------------------------------------
+
+    def _sample(self):
+        own = threading.get_ident()
+        expected = time.perf_counter() + self.sample_interval
+        while self.active:
+            time.sleep(self.sample_interval)
+            now = time.perf_counter()
+            self.add('sampler.wakeup_delay', max(0.0, now - expected))
+            expected = now + self.sample_interval
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    # -- output --------------------------------------------------------------
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        lines = [f"Profile: {elapsed:.1f} s, {self.samples} stack samples",
+                 f"{'stage':32} {'count':>9} {'total ms':>10} {'avg us':>9} {'max ms':>8} {'% time':>7}"]
+        for stage, (count, total, maximum) in sorted(self.spans.items()):
+            lines.append(f"{stage:32} {count:9d} {total * 1000:10.1f} {total / count * 1e6:9.1f} "
+                         f"{maximum * 1000:8.2f} {100 * total / elapsed:6.1f}%")
+        return '\n'.join(lines)
+
+    def report(self):
+        """Prints the stage totals and writes them plus the collapsed stacks to output_dir."""
+        summary = self.summary()
+        print(summary)
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, f"profile-{datetime.now():%Y%m%d-%H%M%S}")
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + '.txt', 'w') as f:
+            f.write(summary + '\n')
+        print(f"Profile written to {base}.collapsed / .txt")
+
+
+PROFILER = Profiler()
+atexit.register(PROFILER.stop)  # write the report if still profiling at exit
+
+
+def install_signal_handler():
+    """kill -USR1 <pid> toggles profiling (Unix only; call from the main thread)."""
+    import signal
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=PROFILER.toggle).start())
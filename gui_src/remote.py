@@ -0,0 +1,265 @@
+import os
+import queue
+import atexit
+import struct
+import multiprocessing
+from collections import deque
+from multiprocessing import shared_memory
+from gui_src import telemetry
+from gui_src.bout import BoutPipeline
+
+# python main.py --scoring-process
+#
+# Runs a strip's BoutPipeline (device reads + scoring) in its own process, so repaints, sound
+# loading or a GUI crash can't delay device.read() or skew continuous damage timing.
+#
+# The GUI side gets a ProcessBoutPipeline with the same interface as BoutPipeline
+# (output_queue, stop_event, scoring_manager, start/restart/stop/winner), so FencingGui and
+# TiledGui don't know the difference. Underneath:
+#   - HP and continuous-damage state live in a small shared-memory block written seqlock
+#     style by the scoring process: the sequence number is odd while a write is in progress,
+#     readers retry until they see the same even number before and after reading. The GUI
+#     reads the latest state every frame without any message traffic or locking.
+#   - status messages (touches, state changes, device errors) come over a pipe.
+#   - commands (new settings, reset, restart, stop) go the other way over the same pipe.
+#   - stop_event is a multiprocessing.Event shared by both sides.
+#   - with --telemetry FILE, the scoring process logs to FILE.<pid>.
+# If the GUI process dies (killed, crashed), the scoring process notices through its parent's
+# sentinel and keeps going until the bout has a winner (so a --record recording of it is
+# complete), then exits. If the GUI just exits, even on an exception, it stops the scoring
+# process on the way out (atexit), so neither waits on the other.
+
+STATE = struct.Struct('<QQddBB')  # seq, command generation, left HP, right HP, left / right taking cont. damage
+SEQLOCK_RETRIES = 10000
+MP_CONTEXT = multiprocessing.get_context('spawn')  # never fork a process that has Tk running
+
+
+class SharedState:
+    """The seqlock-protected state block."""
+
+    def __init__(self, name=None):
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=STATE.size)
+            self.shm.buf[:STATE.size] = bytes(STATE.size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)  # the GUI process owns and unlinks it
+        self.name = self.shm.name
+        self._seq = struct.unpack_from('<Q', self.shm.buf, 0)[0]
+
+    def write(self, generation, left_hp, right_hp, left_cont, right_cont):
+        """Single writer (the scoring process)."""
+        buf = self.shm.buf
+        self._seq += 1  # odd: write in progress
+        struct.pack_into('<Q', buf, 0, self._seq)
+        STATE.pack_into(buf, 0, self._seq, generation, left_hp, right_hp, left_cont, right_cont)
+        self._seq += 1  # even: consistent
+        struct.pack_into('<Q', buf, 0, self._seq)
+
+    def read(self):
+        """(seq, generation, left_hp, right_hp, left_cont, right_cont), never a torn write."""
+        buf = self.shm.buf
+        for _ in range(SEQLOCK_RETRIES):
+            before = struct.unpack_from('<Q', buf, 0)[0]
+            if before & 1:
+                continue
+            state = STATE.unpack_from(buf, 0)
+            if struct.unpack_from('<Q', buf, 0)[0] == before:
+                return (before,) + state[1:]
+        return STATE.unpack_from(buf, 0)  # the writer died mid-write; best effort
+
+    def close(self, unlink=False):
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _run_scoring_process(find_device, detect_hit_state, settings, name, state_name, conn, stop_event,
+                         telemetry_config=None):
+    """Entry point of the scoring process."""
+    if telemetry_config:
+        path, level = telemetry_config
+        telemetry.start(f"{path}.{os.getpid()}", level)
+    pipeline = BoutPipeline(find_device, detect_hit_state, settings, name=name)
+    pipeline.stop_event = stop_event
+    state = SharedState(state_name)
+    generation = 0
+    cont = {'left': False, 'right': False}
+    gui_alive = True
+    parent = multiprocessing.parent_process()
+
+    def publish():
+        left_hp, right_hp = pipeline.scoring_manager.get_hp()
+        state.write(generation, left_hp, right_hp, cont['left'], cont['right'])
+
+    def send(message):
+        nonlocal gui_alive
+        if gui_alive:
+            try:
+                conn.send(message)
+            except (BrokenPipeError, OSError):
+                gui_alive = False  # keep scoring the bout without a GUI
+
+    publish()
+    try:
+        while True:
+            try:
+                item = pipeline.output_queue.get(timeout=0.02)
+                if item['type'] == 'status':
+                    send(item)
+                elif item['type'] == 'cont_dmg_status':
+                    cont = {'left': item['left'], 'right': item['right']}
+                    publish()
+                elif item['type'] == 'health':
+                    publish()
+            except queue.Empty:
+                pass
+
+            if gui_alive:
+                orphaned = not parent.is_alive()  # checked first: commands it sent before dying still count
+                try:
+                    while conn.poll():
+                        command, *args = conn.recv()
+                        if command == 'settings':
+                            pipeline.scoring_manager.update_settings(args[0])
+                        elif command == 'reset':
+                            pipeline.scoring_manager.reset()
+                            generation = args[0]
+                            publish()
+                        elif command == 'start':
+                            pipeline.start()
+                        elif command == 'restart':
+                            pipeline.restart()
+                        elif command == 'stop':
+                            return
+                except (EOFError, OSError):
+                    gui_alive = False
+                if orphaned:
+                    gui_alive = False  # the GUI process is gone without closing the pipe
+            if not gui_alive:
+                thread = pipeline.device_thread
+                if thread is None or pipeline.winner() or stop_event.is_set() or not thread.is_alive():
+                    break  # bout over, or never started
+    finally:
+        pipeline.stop()
+        state.close()
+
+
+class _RemoteScoringManager:
+    """GUI-side stand-in for ScoringManager: HP from shared memory, changes sent as commands."""
+
+    def __init__(self, pipeline, settings):
+        self._pipeline = pipeline
+        self.settings = settings
+        self.left_hp = self.right_hp = settings['max_hp']
+
+    def get_hp(self):
+        seq, generation, left_hp, right_hp, _, _ = self._pipeline.state.read()
+        if generation == self._pipeline.generation:
+            self.left_hp, self.right_hp = left_hp, right_hp
+        # else: a reset is still in flight, keep showing the reset HP rather than the stale one
+        return self.left_hp, self.right_hp
+
+    def update_settings(self, new_settings):
+        self.settings = new_settings
+        self._pipeline.send('settings', new_settings)
+
+    def reset(self):
+        self._pipeline.generation += 1
+        self.left_hp = self.right_hp = self.settings['max_hp']
+        self._pipeline.send('reset', self._pipeline.generation)
+
+
+class _RemoteQueue:
+    """
+    GUI-side output_queue: health / cont_dmg_status messages are made from shared-memory
+    changes, status messages come from the pipe, and anything the GUI puts itself comes back first.
+    """
+
+    def __init__(self, pipeline):
+        self._pipeline = pipeline
+        self._local = deque()
+        self._last_seq = -1
+        self._last_hp = None
+        self._last_cont = None
+
+    def put(self, item):
+        self._local.append(item)
+
+    def get_nowait(self):
+        if self._local:
+            return self._local.popleft()
+        pipeline = self._pipeline
+        seq, generation, left_hp, right_hp, left_cont, right_cont = pipeline.state.read()
+        if seq != self._last_seq and generation == pipeline.generation:
+            self._last_seq = seq
+            if (left_hp, right_hp) != self._last_hp:
+                self._last_hp = (left_hp, right_hp)
+                self._local.append({'type': 'health', 'left': left_hp, 'right': right_hp})
+            if (left_cont, right_cont) != self._last_cont:
+                self._last_cont = (left_cont, right_cont)
+                self._local.append({'type': 'cont_dmg_status', 'left': bool(left_cont), 'right': bool(right_cont)})
+        try:
+            while pipeline.conn.poll():
+                self._local.append(pipeline.conn.recv())
+        except (EOFError, OSError):
+            pass  # scoring process gone; stop() reports it
+        if self._local:
+            return self._local.popleft()
+        raise queue.Empty
+
+
+class ProcessBoutPipeline:
+    """BoutPipeline interface, backed by a BoutPipeline running in a separate process."""
+
+    def __init__(self, find_device, detect_hit_state, settings, name="strip"):
+        self.name = name
+        self.state = SharedState()
+        self.state.write(0, settings['max_hp'], settings['max_hp'], False, False)  # until the process is up
+        self.generation = 0
+        self.conn, child_conn = MP_CONTEXT.Pipe()
+        self.stop_event = MP_CONTEXT.Event()
+        self.scoring_manager = _RemoteScoringManager(self, settings)
+        self.output_queue = _RemoteQueue(self)
+        self.current_device = None  # lives in the scoring process
+        self.process = MP_CONTEXT.Process(
+            target=_run_scoring_process,
+            args=(find_device, detect_hit_state, settings, name, self.state.name, child_conn, self.stop_event,
+                  telemetry.config()),
+            name=f"scoring-{name}",
+        )
+        self.process.start()
+        self._stopped = False
+        atexit.register(self.stop)  # runs before multiprocessing joins the scoring process at exit
+
+    def send(self, *command):
+        try:
+            self.conn.send(command)
+        except (BrokenPipeError, OSError):
+            self.output_queue.put({'type': 'status', 'message': "Scoring process is not running."})
+
+    def start(self):
+        self.send('start')
+
+    def restart(self):
+        self.send('restart')
+
+    def winner(self):
+        left_hp, right_hp = self.scoring_manager.get_hp()
+        if left_hp <= 0:
+            return 'right'
+        if right_hp <= 0:
+            return 'left'
+        return None
+
+    def stop(self):
+        if self._stopped:
+            return
+        self._stopped = True
+        atexit.unregister(self.stop)
+        self.stop_event.set()
+        self.send('stop')
+        self.process.join(timeout=2.0)
+        if self.process.is_alive():
+            print(f"Warning: scoring process {self.name} did not stop, terminating it.")
+            self.process.terminate()
+        self.state.close(unlink=True)
@@ -0,0 +1,144 @@
+import time
+
+
+class CanvasRenderer:
+    """
+    Draws both HP bars, their shake animation and the winner banner for one bout
+    inside a rectangle of a tk.Canvas (the whole canvas, or one tile of it).
+    Everything is a canvas item that gets moved with coords/move, so nothing here triggers
+    a geometry relayout. The renderer owns no timers: the frame scheduler calls step_shake()
+    once per frame for as long as it returns True.
+    """
+
+    BAR_PADDING = 20  # px around each bar (same as the old grid padx/pady)
+    MIN_BAR_THICKNESS = 30
+    SHAKE_STEP = 2
+    SHAKE_MAGNITUDE = 5
+    SHAKE_INTERVAL = 0.03  # seconds per shake step, independent of the frame rate
+
+    def __init__(self, canvas, max_hp):
+        self.canvas = canvas
+        self.max_hp = max_hp
+
+        self._hp = {'left': max_hp, 'right': max_hp}
+        self._color = {'left': None, 'right': None}
+        self._shaking = {'left': False, 'right': False}
+        self._applied_offset = {'left': 0, 'right': 0}  # how far each bar is currently moved from rest
+        self.shake_offset = 0
+        self.shake_direction = 1
+        self._last_shake_step = 0.0
+
+        self._bars = {
+            'left': self.canvas.create_rectangle(0, 0, 0, 0, width=0),
+            'right': self.canvas.create_rectangle(0, 0, 0, 0, width=0),
+        }
+        self._winner_box = self.canvas.create_rectangle(0, 0, 0, 0, width=4, outline="white", state="hidden")
+        self._winner_text = self.canvas.create_text(0, 0, text="", fill="white", state="hidden")
+
+        self._x = 0
+        self._y = 0
+        self._width = 1
+        self._height = 1
+
+    @staticmethod
+    def get_hp_color(hp, max_hp):
+        """Determines the bar color based on HP percentage."""
+        if max_hp <= 0:  # Avoid division by zero and handle edge case
+            return "red"
+        percentage = (hp / max_hp) * 100
+        if percentage > 75:
+            return "green"
+        elif percentage > 50:
+            return "yellow"
+        elif percentage > 25:
+            return "orange"
+        else:
+            return "red"
+
+    def set_max_hp(self, max_hp):
+        self.max_hp = max_hp
+        self._color = {'left': None, 'right': None}  # force a redraw on the next set_hp
+
+    def set_hp(self, left_hp, right_hp):
+        """Moves the top edge of each bar; only touches items whose value or color changed."""
+        for side, hp in (('left', left_hp), ('right', right_hp)):
+            if hp == self._hp[side] and self._color[side] is not None:
+                continue
+            self._hp[side] = hp
+            self._draw_bar(side)
+
+    def set_shaking(self, left, right):
+        """Returns True if the shake animation needs frames."""
+        self._shaking['left'] = left
+        self._shaking['right'] = right
+        return self.animating
+
+    @property
+    def animating(self):
+        return any(self._shaking.values()) or any(self._applied_offset.values())
+
+    def show_winner(self, text, color, font):
+        self.canvas.itemconfigure(self._winner_box, fill=color, state="normal")
+        self.canvas.itemconfigure(self._winner_text, text=text, font=font, state="normal")
+        self.canvas.tag_raise(self._winner_box)
+        self.canvas.tag_raise(self._winner_text)
+
+    def hide_winner(self):
+        self.canvas.itemconfigure(self._winner_box, state="hidden")
+        self.canvas.itemconfigure(self._winner_text, state="hidden")
+
+    def _bar_box(self, side):
+        """Resting (unshaken) coordinates of a bar: centered in its half of the area, filled from the bottom."""
+        column_width = self._width / 2
+        thickness = max(self.MIN_BAR_THICKNESS, (self._width - 2 * self.BAR_PADDING) // 4)
+        center_x = self._x + (column_width / 2 if side == 'left' else column_width * 1.5)
+        top = self._y + self.BAR_PADDING
+        bottom = self._y + self._height - self.BAR_PADDING
+        fraction = min(max(self._hp[side] / self.max_hp, 0), 1) if self.max_hp > 0 else 0
+        fill_top = bottom - (bottom - top) * fraction
+        x0 = center_x - thickness / 2 + self._applied_offset[side]
+        return x0, fill_top, x0 + thickness, bottom
+
+    def _draw_bar(self, side):
+        self.canvas.coords(self._bars[side], *self._bar_box(side))
+        color = self.get_hp_color(self._hp[side], self.max_hp)
+        if color != self._color[side]:
+            self.canvas.itemconfigure(self._bars[side], fill=color)
+            self._color[side] = color
+
+    def _redraw_bars(self):
+        self._draw_bar('left')
+        self._draw_bar('right')
+
+    def set_bounds(self, x, y, width, height):
+        """Places this bout's drawing area on the canvas (called on resize / tile layout)."""
+        self._x, self._y = x, y
+        self._width, self._height = max(width, 1), max(height, 1)
+        self._redraw_bars()
+
+        # banner covers 80% x 25% of the area, centered
+        w, h = self._width * 0.8, self._height * 0.25
+        cx, cy = self._x + self._width / 2, self._y + self._height / 2
+        self.canvas.coords(self._winner_box, cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+        self.canvas.coords(self._winner_text, cx, cy)
+
+    def step_shake(self):
+        """Moves shaking bars one step. Returns True while there's still something to animate."""
+        now = time.perf_counter()
+        if now - self._last_shake_step < self.SHAKE_INTERVAL:
+            return self.animating
+        self._last_shake_step = now
+
+        self.shake_offset += self.shake_direction * self.SHAKE_STEP
+        if abs(self.shake_offset) >= self.SHAKE_MAGNITUDE:
+            self.shake_offset = self.SHAKE_MAGNITUDE * self.shake_direction  # Clamp to magnitude
+            self.shake_direction *= -1  # Reverse direction
+
+        for side in ('left', 'right'):
+            target = self.shake_offset if self._shaking[side] else 0  # not shaking -> back to rest
+            dx = target - self._applied_offset[side]
+            if dx:
+                self.canvas.move(self._bars[side], dx, 0)
+                self._applied_offset[side] = target
+
+        return self.animating
@@ -0,0 +1,227 @@
+# python main.py --replay captures/bout.txt [--speed 0.5]
+#
+# Plays a recorded bout (a --record recording or a testing/device.py log) back through the
+# scoreboard, for disputed touches: scrub to any moment, step report by report, slow it down.
+#
+# The whole recording is scored once when it's loaded. Every REPLAY_KEYFRAME_SEC of bout time a
+# copy of the scorer is kept as a keyframe - HP, last states, state-change times, debounce
+# times and, for rule sets, the phase and its pending timers. Seeking to t finds the last
+# keyframe at or before t (bisect), copies it and re-scores only the reports since, so a seek
+# costs at most one keyframe interval of scoring however long the recording is.
+#
+# ReplayPipeline has BoutPipeline's interface (output_queue, stop_event, scoring_manager,
+# start/restart/stop/winner), so FencingGui shows it like a live bout. It has no thread:
+# the GUI calls advance() once per frame.
+import copy
+import queue
+import time
+from array import array
+from bisect import bisect_right
+from datetime import timedelta
+from threading import Thread, Event
+from gui_src.capture import read_capture, fill_gaps
+from gui_src.filters import make_detector
+from gui_src.player import ScoringManager
+from gui_src.rules import SCORE_MESSAGES
+from gui_src.scorer import BoutScorer
+from gui_src.settings import REPLAY_KEYFRAME_SEC
+
+TOUCH_MESSAGES = set(SCORE_MESSAGES.values())
+
+
+def _mute(message):
+    return
+
+
+class ReplayIndex:
+    """A recording scored once, with scorer keyframes for seeking. Read-only once built."""
+
+    def __init__(self, capture, settings, detect_hit_state, keyframe_interval=REPLAY_KEYFRAME_SEC):
+        capture = fill_gaps([(when, data) for when, data in capture if data])
+        if not capture:
+            raise ValueError("Recording has no reports")
+        self.start_time = capture[0][0]
+        self.times = array('d', ((when - self.start_time).total_seconds() for when, _ in capture))
+        self.reports = [data for _, data in capture]
+        self.duration = self.times[-1]
+        self.settings = settings
+        self.detect_hit_state = detect_hit_state
+
+        self.messages = []  # (seconds, text) of every status message, for the status panel after a seek
+        self.touches = []  # seconds of every scored touch
+        now = [0.0]
+
+        def record(message):
+            if message['type'] == 'status':
+                self.messages.append((now[0], message['message']))
+                if message['message'] in TOUCH_MESSAGES:
+                    self.touches.append(now[0])
+
+        scorer = self._new_scorer(record)
+        self.keyframes = []  # (first report not yet scored, scorer copy)
+        self.keyframe_times = []
+        for i, (t, data) in enumerate(zip(self.times, self.reports)):
+            if not self.keyframe_times or t >= self.keyframe_times[-1] + keyframe_interval:
+                self.keyframes.append((i, self._copy(scorer)))
+                self.keyframe_times.append(t)
+            now[0] = t
+            scorer.process(data, self.start_time + timedelta(seconds=t))
+        self.message_times = array('d', (t for t, _ in self.messages))
+
+    def _new_scorer(self, emit):
+        scoring_manager = ScoringManager(self.settings)
+        detect_hit_state = make_detector(self.detect_hit_state, self.settings)
+        if self.settings.get('ruleset'):
+            from gui_src.rules import RuleScorer
+            return RuleScorer(scoring_manager, detect_hit_state, emit, self.start_time)
+        return BoutScorer(scoring_manager, detect_hit_state, emit, self.start_time)
+
+    def _copy(self, scorer):
+        # settings and a compiled rule set never change during a bout: share them, copy the rest
+        shared = [self.settings, getattr(scorer, 'rules', None)]
+        return copy.deepcopy(scorer, {id(obj): obj for obj in shared if obj is not None})
+
+    def seek(self, t, scoring_manager, emit):
+        """
+        A scorer in the state it had after scoring every report up to t, with its HP moved into
+        scoring_manager, and the number of reports it has scored. It emits to emit from then on.
+        """
+        first, keyframe = self.keyframes[max(0, bisect_right(self.keyframe_times, t) - 1)]
+        scorer = self._copy(keyframe)
+        scorer.emit = _mute
+        end = bisect_right(self.times, t)
+        for i in range(first, end):
+            scorer.process(self.reports[i], self.start_time + timedelta(seconds=self.times[i]))
+        scoring_manager.left_hp, scoring_manager.right_hp = scorer.scoring_manager.get_hp()
+        scorer.scoring_manager = scoring_manager
+        scorer.emit = emit
+        return scorer, end
+
+    def messages_before(self, t, n=5):
+        """The last n status messages up to t."""
+        end = bisect_right(self.message_times, t)
+        return [text for _, text in self.messages[max(0, end - n):end]]
+
+    def touch_before(self, t):
+        """Time of the last touch up to t, or None."""
+        i = bisect_right(self.touches, t)
+        return self.touches[i - 1] if i else None
+
+    def touch_after(self, t):
+        """Time of the first touch after t, or None."""
+        i = bisect_right(self.touches, t)
+        return self.touches[i] if i < len(self.touches) else None
+
+
+class ReplayPipeline:
+    """BoutPipeline interface over a recording, with a seekable playhead."""
+
+    def __init__(self, path, detect_hit_state, settings, speed=1.0):
+        self.path = path
+        self.detect_hit_state = detect_hit_state
+        self.output_queue = queue.Queue()
+        self.stop_event = Event()  # set by the GUI when a player wins; playback pauses there
+        self.scoring_manager = ScoringManager(settings)
+        self.current_device = None
+        self.device_thread = None
+        self.index = None  # built on a background thread by start(), None until the GUI picks it up
+        self._loaded = None  # (index, play, summary) waiting for the GUI thread
+        self.position = 0.0  # playhead, seconds since the first report
+        self.speed = speed
+        self.playing = False
+        self._scorer = None
+        self._next = 0  # next report to score
+        self._last_advance = None
+
+    # -- BoutPipeline interface ---------------------------------------------
+
+    def start(self):
+        self.device_thread = Thread(target=self._load, args=(True,), name="replay-index", daemon=True)
+        self.device_thread.start()
+
+    def restart(self):
+        """New settings: re-score the recording with them, keeping the playhead where it is."""
+        self.playing = False
+        self.index = None
+        self.device_thread = Thread(target=self._load, args=(False,), name="replay-index", daemon=True)
+        self.device_thread.start()
+
+    def stop(self):
+        self.playing = False
+
+    def winner(self):
+        left_hp, right_hp = self.scoring_manager.get_hp()
+        if left_hp <= 0:
+            return 'right'
+        if right_hp <= 0:
+            return 'left'
+        return None
+
+    def _load(self, play):
+        self.output_queue.put({'type': 'status', 'message': f"Loading {self.path}..."})
+        started = time.perf_counter()
+        try:
+            index = ReplayIndex(read_capture(self.path), self.scoring_manager.settings, self.detect_hit_state)
+        except (OSError, ValueError) as e:
+            self.output_queue.put({'type': 'status', 'message': f"Can't replay {self.path}: {e}"})
+            return
+        summary = (f"Replay: {index.duration:.1f} s, {len(index.touches)} touches, "
+                   f"{len(index.keyframes)} keyframes ({time.perf_counter() - started:.1f} s to index)")
+        self._loaded = (index, play, summary)  # only the GUI thread touches the scorer, see advance()
+
+    # -- playback (GUI thread) ----------------------------------------------
+
+    def seek(self, t):
+        """Moves the playhead to t. Stale queued messages are dropped; the GUI re-syncs its display."""
+        index = self.index
+        t = min(max(t, 0.0), index.duration)
+        while True:
+            try:
+                self.output_queue.get_nowait()
+            except queue.Empty:
+                break
+        self._scorer, self._next = index.seek(t, self.scoring_manager, self.output_queue.put)
+        self.position = t
+        self._last_advance = None
+        self.stop_event.clear()
+        self.output_queue.put({'type': 'cont_dmg_status', **self._scorer.last_cont_dmg_status})
+
+    def step(self, reports):
+        """Pauses and moves the playhead by whole reports (negative to go back)."""
+        self.playing = False
+        index = self.index
+        target = min(max(self._next - 1 + reports, 0), len(index.times) - 1)
+        self.seek(index.times[target])
+
+    def set_playing(self, playing):
+        self.playing = playing
+        self._last_advance = None
+
+    def advance(self):
+        """
+        Called every frame: moves the playhead by the time since the last call times speed.
+        Returns True if a newly loaded index was put in place (the GUI should re-sync to it).
+        """
+        if self._loaded is not None:
+            self.index, play, summary = self._loaded
+            self._loaded = None
+            self.seek(min(self.position, self.index.duration))
+            self.output_queue.put({'type': 'status', 'message': summary})
+            self.playing = play
+            return True
+        now = time.monotonic()
+        last, self._last_advance = self._last_advance, now
+        if not self.playing or last is None or self.index is None:
+            return False
+        if self.stop_event.is_set():
+            self.playing = False  # a player has won
+            return False
+        index = self.index
+        self.position = min(self.position + (now - last) * self.speed, index.duration)
+        while self._next < len(index.times) and index.times[self._next] <= self.position:
+            i = self._next
+            self._scorer.process(index.reports[i], index.start_time + timedelta(seconds=index.times[i]))
+            self._next = i + 1
+        if self.position >= index.duration:
+            self.playing = False
+        return False
@@ -0,0 +1,437 @@
+"""
+Declarative scoring modes.
+
+A rule set is a JSON file (see rulesets/) describing phases, what touches do in each phase,
+and how continuous damage builds up. It is compiled once, when a bout starts, into flat
+lookup tables indexed by (phase, last state pair, current state pair, debounce bits), so
+scoring a report costs the same few lookups no matter how many rules the mode has.
+
+Rule set format:
+{
+  "name": "...", "description": "...",
+  "settings": {"counter_window": 2.0},          # extra named values, overridable by game settings
+  "initial_phase": "open",
+  "simultaneous": "open",                       # where a double touch with different gotos goes
+  "phases": {"open": {}, "lockout": {"timeout": "lockout_sec", "then": "open"}},
+  "touches": [                                  # first matching rule per player wins
+    {"phase": "open", "event": "touch", "by": "either",
+     "damage": {"opponent": "hit_dmg"}, "goto": "lockout"}
+  ],
+  "continuous": [
+    {"phase": "*", "state": "HITTING_OPPONENT", "target": "opponent",
+     "delay": "sec_before_cont_dmg", "rate": "hit_dmg_per_ms"}
+  ]
+}
+
+- events: touch (starts HITTING_OPPONENT), self (starts HITTING_SELF), blade (starts WEAPONS_HIT),
+  disconnect (starts DISCONNECTED), release (stops HITTING_OPPONENT)
+- "phase", "goto" and "then" may use {side} / {other}, expanded for the player the rule fires for
+- values are numbers, setting names, or products of them (e.g. "2*hit_dmg", "counter_multiplier*hit_dmg")
+- rules for both players are matched against the phase the report arrived in. When both
+  players' rules "goto" different phases on the same report (a double touch), the bout goes
+  to "simultaneous" (top level, default: the initial phase)
+- "debounce": false lets a rule fire even inside the player's debounce time (default true)
+- continuous rules take either "rate" (per ms, after "delay" seconds of holding) or
+  "curve": [[hold_seconds, rate_per_ms], ...] for damage that ramps up the longer the touch is held
+"""
+import os
+import json
+from datetime import datetime
+from gui_src.player import ScoringManager
+from gui_src.settings import DEBOUNCE_TIME_SEC
+from gui_src.timers import TimerWheel
+
+RULESETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rulesets")
+
+# None is "no report yet", it gets its own index like any other status
+STATUSES = ("NORMAL", "HITTING_OPPONENT", "HITTING_SELF", "DISCONNECTED", "WEAPONS_HIT", "UNKNOWN", None)
+STATUS_INDEX = {status: i for i, status in enumerate(STATUSES)}
+N_STATUS = len(STATUSES)
+N_PAIRS = N_STATUS * N_STATUS
+UNKNOWN_INDEX = STATUS_INDEX["UNKNOWN"]
+NO_REPORT_PAIR = STATUS_INDEX[None] * N_STATUS + STATUS_INDEX[None]
+
+ENTER_EVENTS = {"HITTING_OPPONENT": "touch", "HITTING_SELF": "self", "WEAPONS_HIT": "blade", "DISCONNECTED": "disconnect"}
+SIDES = ("left", "right")
+OTHER = {"left": "right", "right": "left"}
+
+SCORE_MESSAGES = {
+    ("left", "touch"): "*** SCORE: LEFT PLAYER HIT ***",
+    ("left", "self"): "*** SCORE: LEFT SELF-HIT ***",
+    ("right", "touch"): "*** SCORE: RIGHT PLAYER HIT ***",
+    ("right", "self"): "*** SCORE: RIGHT SELF-HIT ***",
+}
+
+
+class RuleSetError(ValueError):
+    pass
+
+
+def find_ruleset(name_or_path):
+    """Accepts a path to a JSON file or the name of one in rulesets/ (without .json)."""
+    if os.path.exists(name_or_path):
+        return name_or_path
+    path = os.path.join(RULESETS_DIR, f"{name_or_path}.json")
+    if not os.path.exists(path):
+        available = sorted(f[:-5] for f in os.listdir(RULESETS_DIR) if f.endswith(".json"))
+        raise RuleSetError(f"No rule set '{name_or_path}'. Available: {', '.join(available)}")
+    return path
+
+
+def load_ruleset(name_or_path):
+    with open(find_ruleset(name_or_path)) as f:
+        return json.load(f)
+
+
+class CompiledRuleSet:
+    """Lookup tables built from a rule set + game settings. Immutable once built."""
+
+    def __init__(self, ruleset, settings):
+        self.name = ruleset.get('name', 'unnamed')
+        self.values = {**ruleset.get('settings', {}), **settings}
+
+        phases = ruleset.get('phases') or {"open": {}}
+        self.phase_names = list(phases)
+        self.phase_index = {name: i for i, name in enumerate(self.phase_names)}
+        self.initial_phase = self._phase(ruleset.get('initial_phase', self.phase_names[0]))
+
+        # per phase: (timeout seconds or None, phase index to go to)
+        self.timeouts = []
+        for name in self.phase_names:
+            spec = phases[name]
+            if 'timeout' in spec:
+                self.timeouts.append((self._value(spec['timeout']), self._phase(spec.get('then', name))))
+            else:
+                self.timeouts.append((None, None))
+
+        # phase to go to when both players' touches move the phase, to different phases
+        self.simultaneous = self._phase(ruleset['simultaneous']) if 'simultaneous' in ruleset else self.initial_phase
+
+        self.touch_rules = ruleset.get('touches', [])
+        self.continuous_rules = ruleset.get('continuous', [])
+        for rule in self.touch_rules:
+            if rule.get('event') not in ("touch", "self", "blade", "disconnect", "release"):
+                raise RuleSetError(f"Unknown event in rule {rule}")
+
+        self.transitions = self._compile_transitions()
+        self.continuous = self._compile_continuous()
+
+    def _phase(self, name):
+        try:
+            return self.phase_index[name]
+        except KeyError:
+            raise RuleSetError(f"Unknown phase '{name}' in rule set '{self.name}'")
+
+    def _value(self, spec):
+        if isinstance(spec, (int, float)):
+            return float(spec)
+        value = 1.0
+        for part in spec.split('*'):  # "2*hit_dmg", "counter_multiplier*hit_dmg", ...
+            part = part.strip()
+            try:
+                value *= float(part)
+            except ValueError:
+                if part not in self.values:
+                    raise RuleSetError(f"Unknown setting '{part}' in rule set '{self.name}'")
+                value *= float(self.values[part])
+        return value
+
+    @staticmethod
+    def _matches_phase(rule, phase_name, side):
+        pattern = rule.get('phase', '*')
+        patterns = pattern if isinstance(pattern, list) else [pattern]
+        return any(p == '*' or p.format(side=side, other=OTHER[side]) == phase_name for p in patterns)
+
+    @staticmethod
+    def _matches_side(rule, side):
+        return rule.get('by', 'either') in ('either', side)
+
+    def _fire(self, phase, side, event, debounce_ok):
+        """Returns (damage dict, next phase, message) for the first rule that matches, or None."""
+        phase_name = self.phase_names[phase]
+        for rule in self.touch_rules:
+            if rule['event'] != event or not self._matches_side(rule, side):
+                continue
+            if not self._matches_phase(rule, phase_name, side):
+                continue
+            if rule.get('debounce', True) and not debounce_ok:
+                return None  # inside this player's debounce time: the touch is ignored
+            damage = {'left': 0.0, 'right': 0.0}
+            for target, amount in rule.get('damage', {}).items():
+                victim = side if target == 'self' else OTHER[side]
+                damage[victim] += self._value(amount)
+            next_phase = phase
+            if 'goto' in rule:
+                next_phase = self._phase(rule['goto'].format(side=side, other=OTHER[side]))
+            message = rule.get('message', SCORE_MESSAGES.get((side, event)) if rule.get('damage') else None)
+            if message:
+                message = message.format(side=side.upper(), other=OTHER[side].upper())
+            return damage, next_phase, message
+        return None
+
+    def _compile_transitions(self):
+        """
+        transitions[(((phase * N_PAIRS) + last_pair) * N_PAIRS + cur_pair) * 4 + debounce_bits]
+          = (left damage, right damage, next phase, messages, counted sides) or None for "nothing happens".
+        debounce_bits: bit 0 = left outside its debounce time, bit 1 = right.
+        """
+        table = [None] * (len(self.phase_names) * N_PAIRS * N_PAIRS * 4)
+        for phase in range(len(self.phase_names)):
+            for last_pair in range(N_PAIRS):
+                last = divmod(last_pair, N_STATUS)
+                for cur_pair in range(N_PAIRS):
+                    if cur_pair == last_pair:
+                        continue  # no state change, never any touch
+                    cur = divmod(cur_pair, N_STATUS)
+                    for bits in range(4):
+                        table[((phase * N_PAIRS + last_pair) * N_PAIRS + cur_pair) * 4 + bits] = \
+                            self._compile_one(phase, last, cur, bits)
+        return table
+
+    def _compile_one(self, phase, last, cur, bits):
+        # both players' rules are matched against the phase the report arrived in, so neither
+        # side's goto can change what the other side's simultaneous touch does
+        damage = {'left': 0.0, 'right': 0.0}
+        messages = []
+        counted = []
+        gotos = [phase, phase]
+        for i, side in enumerate(SIDES):
+            before, after = STATUSES[last[i]], STATUSES[cur[i]]
+            if before == after:
+                continue
+            events = []
+            if after in ENTER_EVENTS:
+                events.append(ENTER_EVENTS[after])
+            if before == "HITTING_OPPONENT":
+                events.append("release")
+            for event in events:
+                fired = self._fire(phase, side, event, bool(bits & (1 << i)))
+                if fired is None:
+                    continue
+                rule_damage, goto, message = fired
+                if goto != phase:
+                    gotos[i] = goto
+                damage['left'] += rule_damage['left']
+                damage['right'] += rule_damage['right']
+                if message:
+                    messages.append(message)
+                if event in ("touch", "self"):
+                    counted.append(i)
+        if gotos[0] == phase or gotos[0] == gotos[1]:
+            next_phase = gotos[1]
+        elif gotos[1] == phase:
+            next_phase = gotos[0]
+        else:
+            next_phase = self.simultaneous  # both sides moved the phase, to different places
+        if not (damage['left'] or damage['right'] or messages or counted or next_phase != phase):
+            return None
+        return damage['left'], damage['right'], next_phase, tuple(messages), tuple(counted)
+
+    def _compile_continuous(self):
+        """
+        continuous[phase * N_PAIRS + pair] = ((left attacker segments), (right attacker segments)) or None.
+        Segments are (hold seconds, rate per ms) sorted by hold time; the attacker's opponent takes the damage.
+        """
+        table = [None] * (len(self.phase_names) * N_PAIRS)
+        for phase in range(len(self.phase_names)):
+            phase_name = self.phase_names[phase]
+            for pair in range(N_PAIRS):
+                states = divmod(pair, N_STATUS)
+                per_side = []
+                for i, side in enumerate(SIDES):
+                    segments = ()
+                    for rule in self.continuous_rules:
+                        if not self._matches_side(rule, side) or not self._matches_phase(rule, phase_name, side):
+                            continue
+                        if rule.get('state', "HITTING_OPPONENT") != STATUSES[states[i]]:
+                            continue
+                        if rule.get('target', 'opponent') != 'opponent':
+                            raise RuleSetError("Continuous damage can only target the opponent")
+                        if 'curve' in rule:
+                            segments = tuple(sorted((self._value(t), self._value(r)) for t, r in rule['curve']))
+                        else:
+                            segments = ((self._value(rule.get('delay', 0)), self._value(rule['rate'])),)
+                        break
+                    per_side.append(segments)
+                if per_side[0] or per_side[1]:
+                    table[phase * N_PAIRS + pair] = tuple(per_side)
+        return table
+
+
+def continuous_rate(segments, hold):
+    """Damage per ms for a touch held `hold` seconds (0 before the first segment starts)."""
+    rate = 0.0
+    for start, segment_rate in segments:
+        if hold < start:
+            break
+        rate = segment_rate
+    return rate
+
+
+_compiled_cache = {}
+
+
+def compile_ruleset(name_or_path, settings):
+    """Loads and compiles a rule set; reuses the tables if the same rule set + settings were compiled before."""
+    path = find_ruleset(name_or_path)
+    key = (os.path.abspath(path), os.path.getmtime(path), tuple(sorted((k, str(v)) for k, v in settings.items())))
+    if key not in _compiled_cache:
+        _compiled_cache[key] = CompiledRuleSet(load_ruleset(path), settings)
+    return _compiled_cache[key]
+
+
+class RuleScorer:
+    """
+    Scores reports with a compiled rule set. Same interface and messages as BoutScorer,
+    so the device loop, the GUI and the offline tools don't care which one they run.
+
+    Phase timeouts (lockout, counter windows) and the moment held-touch damage kicks in are
+    deadlines on a TimerWheel advanced by the report timestamps, so live bouts and
+    accelerated replays behave identically.
+    """
+
+    def __init__(self, scoring_manager: ScoringManager, detect_hit_state, emit, start_time: datetime,
+                 ruleset=None, timers: TimerWheel = None):
+        self.scoring_manager = scoring_manager
+        self.detect_hit_state = detect_hit_state
+        self.emit = emit
+        settings = {k: v for k, v in scoring_manager.settings.items() if k != 'ruleset'}
+        self.rules = compile_ruleset(ruleset or scoring_manager.settings['ruleset'], settings)
+        self.debounce_time = scoring_manager.settings.get('debounce_time', DEBOUNCE_TIME_SEC)
+
+        # all times below are seconds since start_time
+        self.start_time = start_time
+        self.timers = timers or TimerWheel()
+        self.now = 0.0
+        self.last_loop_time = 0.0
+        self.last_pair = NO_REPORT_PAIR
+        self.change_times = [0.0, 0.0]
+        self.last_hit_times = [float('-inf'), float('-inf')]
+
+        self.taking = [False, False]  # is left / right taking continuous damage right now
+        self._continuous_timers = [None, None]  # per attacker: when their held touch starts doing damage
+        self.last_cont_dmg_status = {'left': False, 'right': False}
+
+        self._phase_timer = None
+        self._enter_phase(self.rules.initial_phase, 0.0)
+
+    def _enter_phase(self, phase, at):
+        self.phase = phase
+        if self._phase_timer is not None:
+            self._phase_timer.cancel()
+            self._phase_timer = None
+        timeout, then = self.rules.timeouts[phase]
+        if timeout is not None:
+            self._phase_timer = self.timers.schedule(at + timeout, self._on_phase_timeout, then)
+
+    def _on_phase_timeout(self, deadline, then):
+        self._phase_timer = None
+        self._enter_phase(then, deadline)
+        self._schedule_continuous(0, deadline)
+        self._schedule_continuous(1, deadline)
+
+    def _schedule_continuous(self, attacker, now):
+        """(Re)arms the deadline at which `attacker`'s held touch starts doing damage in the current phase/state."""
+        if self._continuous_timers[attacker] is not None:
+            self._continuous_timers[attacker].cancel()
+            self._continuous_timers[attacker] = None
+        continuous = self.rules.continuous[self.phase * N_PAIRS + self.last_pair]
+        segments = continuous[attacker] if continuous is not None else ()
+        if not segments:
+            self.taking[1 - attacker] = False
+            return
+        starts = self.change_times[attacker] + segments[0][0]
+        if starts <= now:
+            self.taking[1 - attacker] = True
+        else:
+            self.taking[1 - attacker] = False
+            self._continuous_timers[attacker] = self.timers.schedule(starts, self._on_continuous_start, attacker)
+
+    def _on_continuous_start(self, deadline, attacker):
+        self._continuous_timers[attacker] = None
+        self.taking[1 - attacker] = True
+
+    def reset_states(self):
+        """Forget the last seen states, e.g. after the device reconnects."""
+        self.last_pair = NO_REPORT_PAIR
+        self._schedule_continuous(0, self.now)
+        self._schedule_continuous(1, self.now)
+
+    def process(self, data, current_time: datetime):
+        rules = self.rules
+        now = (current_time - self.start_time).total_seconds()
+        dt = now - self.last_loop_time
+        self.now = now
+        hp_changed = False
+
+        # continuous damage over the last interval uses the phase that was active during it,
+        # so it's applied before timers move the phase on
+        if data:
+            continuous = rules.continuous[self.phase * N_PAIRS + self.last_pair]
+            if continuous is not None:
+                for attacker, segments in enumerate(continuous):
+                    if not segments:
+                        continue
+                    rate = continuous_rate(segments, now - self.change_times[attacker])
+                    if rate > 0 and self._damage(1 - attacker, rate * dt * 1000):
+                        hp_changed = True
+
+        # lockout / counter windows ending, held touches starting to do damage
+        self.timers.advance(now)
+
+        if data:
+            left_status, right_status = self.detect_hit_state(data)
+            cur_pair = STATUS_INDEX.get(left_status, UNKNOWN_INDEX) * N_STATUS + STATUS_INDEX.get(right_status, UNKNOWN_INDEX)
+
+            if cur_pair != self.last_pair:
+                last_l, last_r = divmod(self.last_pair, N_STATUS)
+                cur_l, cur_r = divmod(cur_pair, N_STATUS)
+                if cur_l != last_l:
+                    self.change_times[0] = now
+                if cur_r != last_r:
+                    self.change_times[1] = now
+                self.emit({'type': 'status', 'message': f"[{now:.2f}s] L: {left_status}, R: {right_status}"})
+
+                bits = 0
+                if now - self.last_hit_times[0] >= self.debounce_time:
+                    bits |= 1
+                if now - self.last_hit_times[1] >= self.debounce_time:
+                    bits |= 2
+                action = rules.transitions[((self.phase * N_PAIRS + self.last_pair) * N_PAIRS + cur_pair) * 4 + bits]
+                self.last_pair = cur_pair
+                if action is not None:
+                    left_dmg, right_dmg, next_phase, messages, counted = action
+                    for message in messages:
+                        self.emit({'type': 'status', 'message': message})
+                    for side in counted:
+                        self.last_hit_times[side] = now
+                    if left_dmg and self._damage(0, left_dmg):
+                        hp_changed = True
+                    if right_dmg and self._damage(1, right_dmg):
+                        hp_changed = True
+                    if next_phase != self.phase:
+                        self._enter_phase(next_phase, now)
+                self._schedule_continuous(0, now)
+                self._schedule_continuous(1, now)
+
+        current_cont_dmg_status = {'left': self.taking[0], 'right': self.taking[1]}
+        if current_cont_dmg_status != self.last_cont_dmg_status:
+            self.emit({'type': 'cont_dmg_status', **current_cont_dmg_status})
+            self.last_cont_dmg_status = current_cont_dmg_status
+
+        if hp_changed:
+            left_hp, right_hp = self.scoring_manager.get_hp()
+            self.emit({'type': 'health', 'left': left_hp, 'right': right_hp})
+
+        self.last_loop_time = now
+
+    def _damage(self, side, amount):
+        manager = self.scoring_manager
+        if side == 0:
+            if manager.left_hp > 0:
+                manager.left_hp = max(0, manager.left_hp - amount)
+                return True
+        elif manager.right_hp > 0:
+            manager.right_hp = max(0, manager.right_hp - amount)
+            return True
+        return False
@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta
+from gui_src.player import ScoringManager
+from gui_src.telemetry import event, intern, DEBUG
+from gui_src.settings import (
+    DEBOUNCE_TIME_SEC,
+    secBeforeContDmg,
+)
+
+STATE_CHANGE = event("state_change", DEBUG, "side", "old:str", "new:str")  # side 0 = left, 1 = right
+
+
+class BoutScorer:
+    """
+    Turns one VSM report at a time into scoring: detects state changes, applies debouncing,
+    delegates damage to ScoringManager and emits the same messages the GUI reads from its queue.
+    Holds no device or thread, so the live device loop, replays and offline tools all score
+    through this exact code.
+    """
+
+    def __init__(self, scoring_manager: ScoringManager, detect_hit_state, emit, start_time: datetime):
+        # emit(message) receives each GUI message dict (output_queue.put in the live loop)
+        self.scoring_manager = scoring_manager
+        self.detect_hit_state = detect_hit_state
+        self.emit = emit
+
+        # Settings are managed by self.scoring_manager
+        self.debounce_time = scoring_manager.settings.get('debounce_time', DEBOUNCE_TIME_SEC)
+        self.start_time = start_time
+        self.last_reported_state = (None, None)  # Will store state tuples (left_status, right_status)
+        self.time_last_reported = None  # Initialize to None, set on first valid state
+        self.last_state_change_time_l, self.last_state_change_time_r = start_time, start_time
+        self.last_loop_time = start_time  # Track time for delta calculation
+
+        # Track last hit time for each player (for proper debouncing)
+        self.last_left_hit_time = datetime.min
+        self.last_right_hit_time = datetime.min
+
+        # Track continuous damage status to only send updates on change
+        self.last_cont_dmg_status = {'left': False, 'right': False}
+
+    def reset_states(self):
+        """Forget the last seen states, e.g. after the device reconnects."""
+        self.time_last_reported = None
+        self.last_reported_state = (None, None)
+
+    def process(self, data, current_time: datetime):
+        """
+        Scores one read. data is the report (empty if the read timed out), current_time is
+        when the read started.
+        """
+        time_delta: timedelta = current_time - self.last_loop_time
+        hp_changed_continuous = False
+        hp_changed_one_time = False
+
+        if data:
+            current_state_tuple = self.detect_hit_state(data)
+
+            # continuous damage
+            hp_changed_continuous = self.scoring_manager.apply_continuous_damage(
+                last_state_tuple=self.last_reported_state,
+                time_delta=time_delta,
+                last_state_change_times=(self.last_state_change_time_l, self.last_state_change_time_r),
+                current_time=current_time
+            )
+
+            state_changed = False
+            left_status, right_status = current_state_tuple
+            left_last, right_last = self.last_reported_state
+
+            # Detect state changes
+            if left_status != left_last:
+                if STATE_CHANGE.enabled:
+                    STATE_CHANGE.emit(0, intern(left_last), intern(left_status))
+                self.last_state_change_time_l = current_time
+                state_changed = True
+
+            if right_status != right_last:
+                if STATE_CHANGE.enabled:
+                    STATE_CHANGE.emit(1, intern(right_last), intern(right_status))
+                self.last_state_change_time_r = current_time
+                state_changed = True
+
+            if state_changed:
+                # Log state change
+                elapsed = (current_time - self.start_time).total_seconds()
+                status_message = f"[{elapsed:.2f}s] L: {left_status}, R: {right_status}"
+                self.emit({'type': 'status', 'message': status_message})
+
+                # Check for new hits with proper debouncing logic
+                left_hit_now = False
+                right_hit_now = False
+
+                # Check for left player hit transitions
+                if ((left_status == "HITTING_OPPONENT" and left_last != "HITTING_OPPONENT") or
+                    (left_status == "HITTING_SELF" and left_last != "HITTING_SELF")):
+                    # Only apply debounce for repeated hits, not the first hit
+                    if (current_time - self.last_left_hit_time).total_seconds() >= self.debounce_time:
+                        left_hit_now = True
+                        self.last_left_hit_time = current_time  # Update last hit time
+
+                # Check for right player hit transitions
+                if ((right_status == "HITTING_OPPONENT" and right_last != "HITTING_OPPONENT") or
+                    (right_status == "HITTING_SELF" and right_last != "HITTING_SELF")):
+                    # Only apply debounce for repeated hits, not the first hit
+                    if (current_time - self.last_right_hit_time).total_seconds() >= self.debounce_time:
+                        right_hit_now = True
+                        self.last_right_hit_time = current_time  # Update last hit time
+
+                # Apply one-time damage logic if we have valid hits
+                if left_hit_now or right_hit_now:
+                    score_messages = []
+
+                    # Only add messages for hits that passed the debounce check
+                    if left_hit_now:
+                        if left_status == "HITTING_OPPONENT":
+                            score_messages.append("*** SCORE: LEFT PLAYER HIT ***")
+                        elif left_status == "HITTING_SELF":
+                            score_messages.append("*** SCORE: LEFT SELF-HIT ***")
+
+                    if right_hit_now:
+                        if right_status == "HITTING_OPPONENT":
+                            score_messages.append("*** SCORE: RIGHT PLAYER HIT ***")
+                        elif right_status == "HITTING_SELF":
+                            score_messages.append("*** SCORE: RIGHT SELF-HIT ***")
+
+                    for msg in score_messages:
+                        self.emit({'type': 'status', 'message': msg})
+
+                    # Apply one-time damage without using the debounce method
+                    hp_changed_one_time = self.scoring_manager.apply_one_time_damage(
+                        last_state_tuple=self.last_reported_state,
+                        current_state_tuple=current_state_tuple
+                    )
+
+                self.last_reported_state = current_state_tuple
+                self.time_last_reported = current_time
+
+        sec_before_cont_dmg = self.scoring_manager.settings.get('sec_before_cont_dmg', secBeforeContDmg)
+        cont_dmg_delay = timedelta(seconds=sec_before_cont_dmg)
+
+        # Left takes continuous damage if Right was hitting opponent/weapons continuously
+        left_is_taking_cont_dmg = (
+            self.last_reported_state[1] in ("HITTING_OPPONENT", "WEAPONS_HIT") and
+            (current_time - self.last_state_change_time_r) >= cont_dmg_delay
+        )
+        # Right takes continuous damage if Left was hitting opponent/weapons continuously
+        right_is_taking_cont_dmg = (
+            self.last_reported_state[0] in ("HITTING_OPPONENT", "WEAPONS_HIT") and
+            (current_time - self.last_state_change_time_l) >= cont_dmg_delay
+        )
+
+        current_cont_dmg_status = {'left': left_is_taking_cont_dmg, 'right': right_is_taking_cont_dmg}
+
+        if current_cont_dmg_status != self.last_cont_dmg_status:
+            self.emit({'type': 'cont_dmg_status', **current_cont_dmg_status})
+            self.last_cont_dmg_status = current_cont_dmg_status
+
+        if hp_changed_continuous or hp_changed_one_time:
+            current_left_hp, current_right_hp = self.scoring_manager.get_hp()
+            self.emit({'type': 'health', 'left': current_left_hp, 'right': current_right_hp})
+
+        # Update last loop time for next iteration's delta calculation
+        self.last_loop_time = current_time
@@ -8,3 +8,50 @@ MAX_HP = 125
 DEBOUNCE_TIME_SEC = 0.2
 
 secBeforeContDmg = 0.5
+
+RULESET = None  # scoring mode from rulesets/ (e.g. "lockout"), None = built-in scorer
+
+# Filtering of the 20 sub-samples in each report (see gui_src/filters.py)
+STATE_FILTER = None  # None (newest sample only, as before), "majority", "hysteresis" or "min_run"
+STATE_FILTER_VOTES = 14  # hysteresis: samples (of 20) that must agree before the status changes
+STATE_FILTER_RUN = 5  # min_run: newest samples that must agree before the status changes
+
+# Timestamp reports from the VSM's report counter (data[0]) instead of host arrival time (see DeviceClock)
+DEVICE_CLOCK = False
+DEVICE_CLOCK_WINDOW = 512  # reports used to fit the device clock rate
+
+# Drain every report waiting in the device's buffer per read instead of one (see devices.read_batch)
+BATCH_READ = False
+BATCH_READ_MAX = 64  # most reports scored per wakeup
+REPORT_INTERVAL_SEC = 0.01  # nominal time between VSM reports
+
+# Directory to record every report into (python main.py --record DIR, see gui_src/capture.py)
+RECORD_DIR = None
+
+TARGET_FPS = 30  # GUI render loop rate
+IDLE_POLL_SEC = 0.1  # how often the GUI checks for device messages while nothing is animating
+
+# Telemetry log (python main.py --telemetry FILE, see gui_src/telemetry.py)
+TELEMETRY_LEVEL = "info"  # debug adds every state change
+TELEMETRY_RING_SIZE = 4096  # records buffered per thread between flushes
+TELEMETRY_FLUSH_SEC = 0.2
+
+METRICS_SNAPSHOT_SEC = 5  # python main.py --metrics-file FILE rewrite interval
+
+# Profiling (python main.py --profile, or F9 / SIGUSR1 at runtime, see gui_src/profiler.py)
+PROFILE_SAMPLE_SEC = 0.005  # stack sampling interval
+PROFILE_DIR = "profiles"
+
+# Device reconnection (see gui_src/devices.py)
+ENUMERATION_CACHE_SEC = 0.5  # how long a device enumeration is reused when hot-plug events aren't available
+RECONNECT_BACKOFF_INITIAL_SEC = 0.05
+RECONNECT_BACKOFF_MAX_SEC = 1.0
+RECONNECT_BACKOFF_FACTOR = 2
+
+# Replay (python main.py --replay FILE, see gui_src/replay.py)
+REPLAY_KEYFRAME_SEC = 5.0  # bout time between scorer snapshots; a seek re-scores at most this much
+REPLAY_SPEEDS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+REPLAY_TOUCH_LEAD_SEC = 3.0  # jumping to a touch lands this long before it
+
+# Cue sounds (see gui_src/sounds.py)
+SOUND_CACHE_DIR = "sounds/.cache"  # rendered cue variants, keyed by content hash; safe to delete
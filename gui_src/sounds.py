@@ -0,0 +1,153 @@
+# Cue sounds: variants of the base sounds in sounds/ (pitch, gain, length) for each player and
+# HP threshold, rendered once to WAV - plain PCM, so playing one never decodes anything - and
+# cached in SOUND_CACHE_DIR under a hash of the base sound's bytes and the variant's settings.
+#
+#     python -m gui_src.sounds          # render any missing variants now (e.g. after editing CUES)
+#
+# The GUI calls prepare() on its background audio thread at startup. With a warm cache that's a
+# hash of each base file and an os.path.exists() per cue; nothing is decoded or rendered. A cue
+# that isn't ready plays its base sound instead, so a missing variant never delays a hit. A
+# variant that can't be rendered is remembered as failed (KEY.failed, holding the error) and not
+# tried again until its key changes or `python -m gui_src.sounds` retries it. Editing a base
+# sound or a cue changes its key, so stale variants are never played; they're deleted on the
+# next prepare().
+#
+# The base sounds are WAV, read with the standard library. Other formats (e.g. your own MP3s)
+# are decoded with pydub, which isn't in requirements.txt and needs ffmpeg.
+import os
+import sys
+import wave
+import hashlib
+from collections import namedtuple
+from gui_src.settings import SOUND_CACHE_DIR
+
+CACHE_VERSION = 1  # bump when render() changes, so old variants are rebuilt
+
+# source: base sound; semitones: pitch shift (also shortens/lengthens it, like a faster tape);
+# gain_db: volume change; max_sec: cut to this length with a short fade out (None = whole sound)
+Cue = namedtuple('Cue', 'source semitones gain_db max_sec', defaults=(0.0, 0.0, None))
+
+# Higher and more urgent as HP drops
+CUES = {
+    ('left', '75'): Cue('sounds/left_damage.wav'),
+    ('left', '50'): Cue('sounds/left_damage.wav', semitones=2, gain_db=1.5),
+    ('left', '25'): Cue('sounds/left_damage.wav', semitones=4, gain_db=3.0),
+    ('right', '75'): Cue('sounds/right_damage.wav'),
+    ('right', '50'): Cue('sounds/right_damage.wav', semitones=2, gain_db=1.5),
+    ('right', '25'): Cue('sounds/right_damage.wav', semitones=4, gain_db=3.0),
+    'gameover': Cue('sounds/gameover.wav'),
+}
+
+FADE_SEC = 0.02
+
+_paths = {}  # cue name -> file to play, filled in by prepare()
+
+
+def cue_path(name):
+    """File to play for a cue: its cached variant once prepare() has it, else the base sound."""
+    return _paths.get(name) or CUES[name].source
+
+
+def is_variant(cue):
+    """False if the cue is its base sound unchanged (nothing to render)."""
+    return bool(cue.semitones or cue.gain_db or cue.max_sec is not None)
+
+
+def cue_key(cue):
+    """Content hash of everything that goes into a variant."""
+    digest = hashlib.sha256()
+    with open(cue.source, 'rb') as f:
+        digest.update(f.read())
+    digest.update(f"{CACHE_VERSION}|{cue.semitones}|{cue.gain_db}|{cue.max_sec}".encode())
+    return digest.hexdigest()[:20]
+
+
+def _decode(path):
+    """(samples as float32 array of shape (frames, channels) in -1..1, frame rate)."""
+    import numpy as np
+    if path.lower().endswith('.wav'):
+        with wave.open(path, 'rb') as f:
+            width, channels, rate = f.getsampwidth(), f.getnchannels(), f.getframerate()
+            raw = f.readframes(f.getnframes())
+    else:
+        from pydub import AudioSegment  # optional, needs ffmpeg
+        sound = AudioSegment.from_file(path)
+        width, channels, rate, raw = sound.sample_width, sound.channels, sound.frame_rate, sound.raw_data
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    else:
+        dtype = {2: np.int16, 4: np.int32}[width]
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / float(2 ** (8 * width - 1))
+    return samples.reshape(-1, channels), rate
+
+
+def render(cue, path):
+    """Renders a variant of cue.source to a 16-bit WAV at path."""
+    import numpy as np
+    samples, rate = _decode(cue.source)
+    if cue.semitones:
+        # resample so it plays 2^(semitones/12) times faster at the same rate: pitch and tempo both shift
+        factor = 2 ** (cue.semitones / 12)
+        positions = np.arange(0, len(samples) - 1, factor)
+        samples = np.stack([np.interp(positions, np.arange(len(samples)), samples[:, ch])
+                            for ch in range(samples.shape[1])], axis=1)
+    if cue.max_sec is not None and len(samples) > cue.max_sec * rate:
+        samples = samples[:int(cue.max_sec * rate)].copy()
+        fade = min(len(samples), int(FADE_SEC * rate))
+        samples[len(samples) - fade:] *= np.linspace(1.0, 0.0, fade, dtype=np.float32)[:, None]
+    if cue.gain_db:
+        samples = samples * 10 ** (cue.gain_db / 20)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    tmp = path + '.tmp'
+    with wave.open(tmp, 'wb') as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(rate)
+        f.writeframes(pcm.tobytes())
+    os.replace(tmp, path)  # a half-written variant is never picked up
+
+
+def prepare(cues=CUES, cache_dir=SOUND_CACHE_DIR, build=True, retry_failed=False):
+    """
+    Points every cue at its cached variant, rendering missing ones if build is set (and ones
+    that failed before if retry_failed is set), and deletes variants no cue uses any more.
+    Returns {cue name: path or None if it plays its base sound}.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    paths, wanted = {}, set()
+    for name, cue in cues.items():
+        if not is_variant(cue):
+            paths[name] = None  # the base sound as is
+            continue
+        try:
+            path = os.path.join(cache_dir, cue_key(cue) + '.wav')
+        except OSError as e:
+            print(f"Sound cue {name}: {e}")
+            paths[name] = None
+            continue
+        failed = path[:-len('.wav')] + '.failed'
+        wanted.update((os.path.basename(path), os.path.basename(failed)))
+        if not os.path.exists(path) and build and (retry_failed or not os.path.exists(failed)):
+            try:
+                render(cue, path)
+            except Exception as e:  # any decoder error (e.g. pydub's CouldntDecodeError), never fatal
+                print(f"Sound cue {name}: can't render {cue.source} ({e}), playing it unchanged")
+                with open(failed, 'w') as f:
+                    f.write(f"{cue.source}: {e}\n")
+            else:
+                if os.path.exists(failed):
+                    os.remove(failed)
+        paths[name] = path if os.path.exists(path) else None
+        if paths[name]:
+            _paths[name] = path
+    for stale in set(os.listdir(cache_dir)) - wanted:
+        if stale.endswith(('.wav', '.failed')):
+            os.remove(os.path.join(cache_dir, stale))
+    return paths
+
+
+if __name__ == "__main__":
+    prepared = prepare(retry_failed=True)
+    for name, path in prepared.items():
+        print(f"{name}: {path or CUES[name].source}")
+    sys.exit(0 if all(path or not is_variant(CUES[name]) for name, path in prepared.items()) else 1)
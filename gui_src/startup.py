@@ -0,0 +1,47 @@
+# Startup timing report: python main.py --startup-report (main.py calls enable())
+# Import this module first (main.py does) so the clock starts as early as possible.
+# For a per-module import breakdown use: python -X importtime main.py
+import time
+from threading import Lock
+
+_start = time.perf_counter()
+_marks = []
+_lock = Lock()  # marks come from both the Tk thread and background threads
+
+ENABLED = False
+
+
+def enable():
+    """Prints marks as they happen from now on, after the ones recorded so far."""
+    global ENABLED
+    ENABLED = True
+    for name, ms in report():
+        print(f"[startup] {name}: {ms:.1f} ms")
+
+
+def mark(name):
+    """Records how long after startup `name` happened."""
+    with _lock:
+        _marks.append((name, time.perf_counter() - _start))
+    if ENABLED:
+        print(f"[startup] {name}: {(time.perf_counter() - _start) * 1000:.1f} ms")
+
+
+def timed_import(module_name):
+    """Imports a module and records how long it took (only useful for the first import)."""
+    t = time.perf_counter()
+    module = __import__(module_name, fromlist=['*'])
+    mark(f"import {module_name} ({(time.perf_counter() - t) * 1000:.1f} ms)")
+    return module
+
+
+def report():
+    """Returns all recorded marks as (name, ms since start) pairs."""
+    with _lock:
+        return [(name, t * 1000) for name, t in _marks]
+
+
+def print_summary():
+    """With --startup-report: every mark so far on one line (called once the scoreboard is up)."""
+    if ENABLED:
+        print("[startup] summary: " + " | ".join(f"{name} {ms:.1f} ms" for name, ms in report()))
@@ -0,0 +1,294 @@
+# Structured telemetry for the device threads, instead of print().
+#
+#     python main.py --telemetry bout.tlog [--telemetry-level debug]
+#     python -m gui_src.telemetry bout.tlog [--level warning] [--event state_change]
+#
+# Events are declared once per module with a fixed layout (three ints and a float), e.g.
+#     STATE_CHANGE = event("state_change", DEBUG, "side", "old:str", "new:str")
+# and emitted from the hot path behind a flag check, so a disabled level costs one attribute
+# read and a branch - no formatting, no call:
+#     if STATE_CHANGE.enabled:
+#         STATE_CHANGE.emit(side, intern(old), intern(new))
+#
+# Each thread writes fixed-size records into its own preallocated ring buffer (single producer,
+# single consumer, so no locks: the producer only moves `head`, the flusher only moves `tail`).
+# A background thread copies new records to the log file a few times a second, so the device
+# thread never waits on a slow terminal or disk. If the flusher falls a whole ring behind, new
+# records are dropped and counted rather than blocking.
+#
+# Log file: MAGIC, then chunks of (kind: 1 byte, length: uint32, payload):
+#   b'H' JSON {"wall": time.time(), "monotonic": time.monotonic()} - clock anchor, first chunk
+#   b'E' JSON event definition {"id", "name", "level", "fields"}
+#   b'S' JSON interned string {"id", "text"}
+#   b'T' JSON thread {"id", "name"}
+#   b'R' packed records (RECORD format), then b'D' JSON {"thread", "dropped"} when any were lost
+import json
+import time
+import atexit
+import struct
+import threading
+from datetime import datetime
+from gui_src.settings import TELEMETRY_LEVEL, TELEMETRY_RING_SIZE, TELEMETRY_FLUSH_SEC
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+OFF = 100
+LEVELS = {'debug': DEBUG, 'info': INFO, 'warning': WARNING, 'error': ERROR, 'off': OFF}
+
+MAGIC = b'VSMTLOG1'
+RECORD = struct.Struct('<dHHiiid')  # monotonic time, event id, thread id, a, b, c, x
+CHUNK = struct.Struct('<cI')
+
+_lock = threading.Lock()  # only for registration and the flusher, never on the emit path
+_events = []
+_strings = {}
+_rings = []
+_local = threading.local()
+_sink = None
+_level = OFF
+_config = None  # (path, level) passed to start()
+
+
+class Event:
+    """One kind of telemetry record. Check `enabled` before calling emit() on hot paths."""
+
+    def __init__(self, event_id, name, level, fields):
+        self.id = event_id
+        self.name = name
+        self.level = level
+        self.fields = fields  # up to 3 int fields ("name" or "name:str") and 1 float ("name:float")
+        self.enabled = _sink is not None and level >= _level
+
+    def emit(self, a=0, b=0, c=0, x=0.0):
+        ring = getattr(_local, 'ring', None) or _thread_ring()
+        ring.write(self.id, a, b, c, x)
+
+
+def event(name, level, *fields):
+    """Declares an event (call at import time). Returns the Event to emit from."""
+    with _lock:
+        e = Event(len(_events), name, level, fields)
+        _events.append(e)
+        return e
+
+
+def intern(text):
+    """Small int standing for a string (e.g. a status name), so records stay fixed-size."""
+    try:
+        return _strings[text]
+    except KeyError:
+        with _lock:
+            return _strings.setdefault(text, len(_strings))
+
+
+def set_level(level):
+    """Changes the level at runtime; 'off' disables every event. Nothing is enabled without a sink."""
+    global _level
+    _level = LEVELS[level] if isinstance(level, str) else level
+    with _lock:
+        for e in _events:
+            e.enabled = _sink is not None and e.level >= _level
+
+
+class Ring:
+    """Preallocated single-producer / single-consumer ring of RECORD-sized slots."""
+
+    def __init__(self, thread_id, name, size=TELEMETRY_RING_SIZE):
+        self.thread_id = thread_id
+        self.name = name
+        self.size = size
+        self.buffer = bytearray(RECORD.size * size)
+        self.head = 0  # records written, only the producer thread changes it
+        self.tail = 0  # records flushed, only the flusher changes it
+        self.dropped = 0
+
+    def write(self, event_id, a, b, c, x):
+        head = self.head
+        if head - self.tail >= self.size:
+            self.dropped += 1  # flusher is a whole ring behind: drop rather than block
+            return
+        RECORD.pack_into(self.buffer, (head % self.size) * RECORD.size,
+                         time.monotonic(), event_id, self.thread_id, a, b, c, x)
+        self.head = head + 1  # publish only after the slot is written
+
+    def take(self):
+        """New records as bytes (called by the flusher)."""
+        head, tail = self.head, self.tail
+        if head == tail:
+            return b''
+        start, end = (tail % self.size) * RECORD.size, (head % self.size) * RECORD.size
+        if start < end:
+            data = bytes(self.buffer[start:end])
+        else:
+            data = bytes(self.buffer[start:]) + bytes(self.buffer[:end])
+        self.tail = head
+        return data
+
+
+def _thread_ring():
+    with _lock:
+        ring = Ring(len(_rings), threading.current_thread().name)
+        _rings.append(ring)
+    _local.ring = ring
+    return ring
+
+
+class Sink:
+    """Background thread that appends new definitions and records to the log file."""
+
+    def __init__(self, path, flush_interval=TELEMETRY_FLUSH_SEC):
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self._chunk(b'H', {'wall': time.time(), 'monotonic': time.monotonic()})
+        self.flush_interval = flush_interval
+        self._written = {'events': 0, 'strings': 0, 'threads': 0}
+        self._dropped = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+
+    def _chunk(self, kind, payload):
+        data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.file.write(CHUNK.pack(kind, len(data)))
+        self.file.write(data)
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with _lock:
+            rings = list(_rings)
+        # take the records first: every string or event they use is registered by now
+        records = [ring.take() for ring in rings]
+        with _lock:
+            events, strings = list(_events), list(_strings.items())
+        for e in events[self._written['events']:]:
+            self._chunk(b'E', {'id': e.id, 'name': e.name, 'level': e.level, 'fields': e.fields})
+        for text, string_id in strings[self._written['strings']:]:
+            self._chunk(b'S', {'id': string_id, 'text': str(text)})
+        for ring in rings[self._written['threads']:]:
+            self._chunk(b'T', {'id': ring.thread_id, 'name': ring.name})
+        self._written = {'events': len(events), 'strings': len(strings), 'threads': len(rings)}
+        for ring, data in zip(rings, records):
+            if data:
+                self._chunk(b'R', data)
+            if ring.dropped != self._dropped.get(ring.thread_id, 0):
+                self._chunk(b'D', {'thread': ring.thread_id, 'dropped': ring.dropped})
+                self._dropped[ring.thread_id] = ring.dropped
+        self.file.flush()
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        self.flush()
+        self.file.close()
+
+
+def start(path, level=TELEMETRY_LEVEL):
+    """
+    Starts logging to path at the given level (see LEVELS). Flushed and closed at exit.
+    main.py calls it for --telemetry; nothing is logged until something does.
+    """
+    global _sink, _config
+    if _sink is not None:
+        return
+    _config = (path, level)
+    _sink = Sink(path)
+    _sink.start()
+    set_level(level)
+    atexit.register(stop)
+
+
+def config():
+    """(path, level) of the running log, or None, so a child process can log next to it."""
+    return _config if _sink is not None else None
+
+
+def stop():
+    global _sink
+    if _sink is None:
+        return
+    set_level(OFF)
+    _sink.stop()
+    _sink = None
+
+
+# ---------------------------------------------------------------------------
+# Decoder
+# ---------------------------------------------------------------------------
+
+def read_log(path):
+    """
+    Yields decoded records as dicts: time (datetime), level, event, thread and the event's
+    fields by name. Also yields {'event': 'dropped', ...} where records were lost.
+    """
+    events, strings, threads = {}, {}, {}
+    anchor = None
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a telemetry log")
+        while True:
+            header = f.read(CHUNK.size)
+            if len(header) < CHUNK.size:
+                return
+            kind, length = CHUNK.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # truncated (the program was killed mid-write)
+            if kind == b'R':
+                for t, event_id, thread_id, a, b, c, x in RECORD.iter_unpack(payload):
+                    e = events[event_id]
+                    record = {
+                        'time': datetime.fromtimestamp(anchor['wall'] + t - anchor['monotonic']),
+                        'level': e['level'],
+                        'event': e['name'],
+                        'thread': threads.get(thread_id, thread_id),
+                    }
+                    for field, value in zip(e['fields'], (a, b, c)):
+                        if field.endswith(':float'):
+                            continue
+                        name, _, kind_ = field.partition(':')
+                        record[name] = strings.get(value, value) if kind_ == 'str' else value
+                    for field in e['fields']:
+                        if field.endswith(':float'):
+                            record[field.partition(':')[0]] = x
+                    yield record
+                continue
+            info = json.loads(payload)
+            if kind == b'H':
+                anchor = info
+            elif kind == b'E':
+                events[info['id']] = info
+            elif kind == b'S':
+                strings[info['id']] = info['text']
+            elif kind == b'T':
+                threads[info['id']] = info['name']
+            elif kind == b'D':
+                yield {'time': None, 'level': WARNING, 'event': 'dropped',
+                       'thread': threads.get(info['thread'], info['thread']), 'dropped': info['dropped']}
+
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Print a telemetry log written with main.py --telemetry")
+    parser.add_argument('log')
+    parser.add_argument('--level', default='debug', choices=list(LEVELS), help="minimum level to show")
+    parser.add_argument('--event', action='append', help="only these events (repeatable)")
+    parser.add_argument('--json', action='store_true', help="one JSON object per line")
+    args = parser.parse_args(argv)
+
+    names = {level: name.upper() for name, level in LEVELS.items()}
+    for record in read_log(args.log):
+        if record['level'] < LEVELS[args.level] or (args.event and record['event'] not in args.event):
+            continue
+        if args.json:
+            print(json.dumps({**record, 'time': record['time'] and str(record['time'])}))
+            continue
+        fields = ' '.join(f"{k}={v}" for k, v in record.items() if k not in ('time', 'level', 'event', 'thread'))
+        print(f"{str(record['time'] or ''):26} {names[record['level']]:7} [{record['thread']}] {record['event']} {fields}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import math
+import queue
+import tkinter as tk
+from tkinter import font as tkFont
+from gui_src import startup
+from gui_src.bout import BoutPipeline, default_settings
+from gui_src.renderer import CanvasRenderer
+from gui_src.frames import FrameScheduler
+from gui_src.profiler import PROFILER
+from gui_src.settings import TARGET_FPS
+
+
+class BoutTile:
+    """One strip on the overview screen: its own BoutPipeline, drawn into a rectangle of the shared canvas."""
+
+    HEADER_HEIGHT = 40
+    FOOTER_HEIGHT = 30
+
+    def __init__(self, canvas, name, bout: BoutPipeline, fonts):
+        self.canvas = canvas
+        self.name = name
+        self.bout = bout
+        self.fonts = fonts
+        max_hp = bout.scoring_manager.settings['max_hp']
+
+        self.renderer = CanvasRenderer(canvas, max_hp=max_hp)
+        self.display_hp = (max_hp, max_hp)
+        self.status = "Initializing..."
+        self.winner = None  # (text, color) while a winner banner should be shown
+
+        self._border = canvas.create_rectangle(0, 0, 0, 0, outline="gray30", width=2)
+        self._header = canvas.create_text(0, 0, text=name, fill="white", font=fonts['label'])
+        self._footer = canvas.create_text(0, 0, text=self.status, fill="gray70", font=fonts['status'])
+
+    def contains(self, x, y):
+        x0, y0, x1, y1 = self.canvas.coords(self._border)
+        return x0 <= x <= x1 and y0 <= y <= y1
+
+    def set_bounds(self, x, y, width, height):
+        self.canvas.coords(self._border, x + 2, y + 2, x + width - 2, y + height - 2)
+        self.canvas.coords(self._header, x + width / 2, y + self.HEADER_HEIGHT / 2)
+        self.canvas.coords(self._footer, x + width / 2, y + height - self.FOOTER_HEIGHT / 2)
+        self.canvas.itemconfigure(self._footer, width=max(width - 20, 1))
+        self.renderer.set_bounds(x, y + self.HEADER_HEIGHT, width,
+                                 height - self.HEADER_HEIGHT - self.FOOTER_HEIGHT)
+
+    def paint_hp(self):
+        left_hp, right_hp = self.display_hp
+        max_hp = self.renderer.max_hp
+        left_percent = int((left_hp / max_hp) * 100) if max_hp > 0 else 0
+        right_percent = int((right_hp / max_hp) * 100) if max_hp > 0 else 0
+        self.canvas.itemconfigure(self._header, text=f"{self.name}   L {left_percent}%  |  R {right_percent}%")
+        self.renderer.set_hp(left_hp, right_hp)
+
+    def paint_status(self):
+        self.canvas.itemconfigure(self._footer, text=self.status)
+
+    def paint_winner(self):
+        if self.winner is None:
+            self.renderer.hide_winner()
+        else:
+            text, color = self.winner
+            self.renderer.show_winner(text, color, self.fonts['winner'])
+
+
+class TiledGui:
+    """
+    Overview screen showing several strips' bouts in one fullscreen window.
+    Every strip has its own device thread and scoring pipeline, but all tiles share one
+    canvas and one frame scheduler, so a frame with N dirty tiles is still a single repaint.
+    No sounds and no settings panel - this is for the DT table, the strips have their own screens.
+    Double-click a tile to reset that bout.
+    """
+
+    def __init__(self, find_devices, detect_hit_state, names=None, ruleset=None, state_filter=None,
+                 scoring_process=False, device_clock=False, batch_read=False, record_dir=None):
+        self.root = tk.Tk()
+        self.root.title("Fencing Hit Detector - Overview")
+        self.root.attributes('-fullscreen', True)
+        self.root.config(bg="black")
+
+        n = len(find_devices)
+        self.columns = math.ceil(math.sqrt(n))
+        self.rows = math.ceil(n / self.columns)
+        scale = max(self.columns, 1)
+        fonts = {
+            'label': tkFont.Font(family="Helvetica", size=max(10, 24 // scale), weight="bold"),
+            'status': tkFont.Font(family="Helvetica", size=max(8, 16 // scale)),
+            'winner': tkFont.Font(family="Helvetica", size=max(14, 48 // scale), weight="bold"),
+        }
+
+        self.canvas = tk.Canvas(self.root, bg="black", highlightthickness=0, borderwidth=0)
+        self.canvas.pack(expand=True, fill="both")
+
+        self.frames = FrameScheduler(self.root, target_fps=TARGET_FPS, poll=self.update_gui)
+        self.tiles = []
+        for i, find_device in enumerate(find_devices):
+            name = names[i] if names else f"STRIP {i + 1}"
+            settings = default_settings()
+            if ruleset:
+                settings['ruleset'] = ruleset
+            if state_filter:
+                settings['state_filter'] = state_filter
+            if device_clock:
+                settings['device_clock'] = True
+            if batch_read:
+                settings['batch_read'] = True
+            if record_dir:
+                settings['record_dir'] = record_dir
+            if scoring_process:
+                from gui_src.remote import ProcessBoutPipeline  # one scoring process per strip
+                bout = ProcessBoutPipeline(find_device, detect_hit_state, settings, name=name)
+            else:
+                bout = BoutPipeline(find_device, detect_hit_state, settings, name=name)
+            tile = BoutTile(self.canvas, name, bout, fonts)
+            self.tiles.append(tile)
+            self.frames.add_region((i, 'hp'), tile.paint_hp)
+            self.frames.add_region((i, 'shake'), tile.renderer.step_shake)
+            self.frames.add_region((i, 'status'), tile.paint_status)
+            self.frames.add_region((i, 'winner'), tile.paint_winner)
+
+        self.canvas.bind("<Configure>", self._layout)
+        self.canvas.bind("<Double-Button-1>", self._on_double_click)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.root.bind("<F9>", lambda event: PROFILER.toggle())  # runtime profiling, see profiler.py
+
+    def run(self):
+        self.frames.start()
+        self.root.after(0, self._finish_startup)  # runs after the first frame
+        self.root.mainloop()
+
+    def _finish_startup(self):
+        startup.mark("first frame")
+        startup.print_summary()
+        for tile in self.tiles:
+            tile.bout.start()
+
+    def _layout(self, event):
+        tile_width = event.width / self.columns
+        tile_height = event.height / self.rows
+        for i, tile in enumerate(self.tiles):
+            row, column = divmod(i, self.columns)
+            tile.set_bounds(column * tile_width, row * tile_height, tile_width, tile_height)
+
+    def _on_double_click(self, event):
+        for i, tile in enumerate(self.tiles):
+            if tile.contains(event.x, event.y):
+                self.reset_tile(i)
+                return
+
+    def reset_tile(self, index):
+        tile = self.tiles[index]
+        tile.bout.scoring_manager.reset()
+        tile.winner = None
+        self.frames.mark_dirty((index, 'winner'))
+        tile.bout.restart()
+        left_hp, right_hp = tile.bout.scoring_manager.get_hp()
+        tile.bout.output_queue.put({'type': 'health', 'left': left_hp, 'right': right_hp})
+        tile.bout.output_queue.put({'type': 'status', 'message': "Bout reset"})
+
+    def update_gui(self):
+        """Drains every strip's queue and marks the affected tile regions dirty."""
+        for i, tile in enumerate(self.tiles):
+            bout = tile.bout
+            try:
+                while True:
+                    item = bout.output_queue.get_nowait()
+                    if item['type'] == 'status':
+                        tile.status = item['message']
+                        self.frames.mark_dirty((i, 'status'))
+                    elif item['type'] == 'cont_dmg_status':
+                        if tile.renderer.set_shaking(item.get('left', False), item.get('right', False)):
+                            self.frames.mark_dirty((i, 'shake'))
+                    elif item['type'] == 'health':
+                        tile.display_hp = (item['left'], item['right'])
+                        self.frames.mark_dirty((i, 'hp'))
+            except queue.Empty:
+                pass
+
+            winner = bout.winner()
+            if winner and tile.winner is None:
+                tile.winner = ("LEFT WINS", "green") if winner == 'left' else ("RIGHT WINS", "red")
+                self.frames.mark_dirty((i, 'winner'))
+                if tile.renderer.set_shaking(False, False):
+                    self.frames.mark_dirty((i, 'shake'))
+                bout.stop_event.set()  # Stop this strip's device thread, the bout is over
+
+    def on_closing(self):
+        print("Closing overview...")
+        for tile in self.tiles:
+            tile.bout.stop_event.set()  # signal every strip first so the joins overlap
+        for tile in self.tiles:
+            tile.bout.stop()
+        self.frames.stop()
+        print(f"Render stats: {self.frames.stats.summary()}")
+        self.root.destroy()
@@ -0,0 +1,204 @@
+import time
+from collections import deque
+from datetime import datetime, timedelta
+
+
+class MonotonicClock:
+    """
+    datetime timestamps that only ever move forward: anchored to the wall clock once,
+    then advanced by time.monotonic(). The device loop stamps reports with this so an
+    NTP adjustment or DST change can't shorten a lockout or inflate continuous damage.
+    """
+
+    def __init__(self):
+        self._anchor = datetime.now()
+        self._anchor_monotonic = time.monotonic()
+
+    def now(self):
+        return self._anchor + timedelta(seconds=time.monotonic() - self._anchor_monotonic)
+
+    def at(self, monotonic_time):
+        """The datetime for a time.monotonic() value."""
+        return self._anchor + timedelta(seconds=monotonic_time - self._anchor_monotonic)
+
+
+class Timer:
+    __slots__ = ('deadline', 'tick', 'callback', 'args', 'cancelled')
+
+    def __init__(self, deadline, tick, callback, args):
+        self.deadline = deadline
+        self.tick = tick
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True  # removed lazily when its slot comes round
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel for lockout / counter-attack / continuous-damage deadlines.
+
+    Time is whatever the caller says it is (seconds, any origin): the scorer advances it with
+    report timestamps, so a bout replayed at 10x fires exactly the same timers as it did live.
+    Scheduling and cancelling are O(1); advancing visits one slot per elapsed tick (or every
+    slot once after a long gap), independent of how many timers are pending.
+    """
+
+    def __init__(self, tick=0.005, slots=512, start=0.0):
+        self.tick = tick
+        self.slots = slots
+        self._wheel = [[] for _ in range(slots)]
+        self._current_tick = self._tick_of(start)
+        self._pending = []  # timers in ticks already reached, waiting for their exact deadline
+        self.now = start
+
+    def _tick_of(self, t):
+        return int(t // self.tick)
+
+    def schedule(self, deadline, callback, *args):
+        """Calls callback(deadline, *args) once time reaches deadline. Returns a Timer with cancel()."""
+        tick = self._tick_of(deadline)
+        timer = Timer(deadline, tick, callback, args)
+        if tick <= self._current_tick:
+            self._pending.append(timer)
+        else:
+            self._wheel[tick % self.slots].append(timer)
+        return timer
+
+    def advance(self, now):
+        """Fires every timer with deadline <= now, in deadline order. Returns how many fired."""
+        if now < self.now:
+            return 0  # time never goes backwards
+        self.now = now
+        target = self._tick_of(now)
+        if target > self._current_tick:
+            if target - self._current_tick >= self.slots:
+                ticks = range(self.slots)  # a long gap: every slot once is enough
+            else:
+                ticks = range(self._current_tick + 1, target + 1)
+            for k in ticks:
+                slot = self._wheel[k % self.slots]
+                if slot:
+                    keep = []
+                    for timer in slot:
+                        if timer.cancelled:
+                            continue
+                        (self._pending if timer.tick <= target else keep).append(timer)
+                    self._wheel[k % self.slots] = keep
+            self._current_tick = target
+
+        fired = 0
+        while self._pending:
+            due = [t for t in self._pending if t.deadline <= now and not t.cancelled]
+            if not due:
+                self._pending = [t for t in self._pending if not t.cancelled]
+                break
+            self._pending = [t for t in self._pending if t.deadline > now and not t.cancelled]
+            due.sort(key=lambda t: t.deadline)
+            for timer in due:
+                if not timer.cancelled:  # an earlier callback may have cancelled it
+                    timer.cancelled = True
+                    timer.callback(timer.deadline, *timer.args)
+                    fired += 1
+            # callbacks may have scheduled more timers that are already due; loop picks them up
+        return fired
+
+
+class DeviceClock:
+    """
+    Report timestamps from the VSM's own clock instead of from when the reader thread got round
+    to them. data[0] is a rolling report counter (+1 per report, ~10 ms, wraps at 256). It is
+    unwrapped into a tick count and fitted to host arrival times as host = offset + period * tick:
+      - period is a least-squares fit over the last `window` reports, so crystal drift between
+        the box and the PC is followed
+      - offset tracks the lower envelope of arrivals: a report can arrive late (scheduling, GC,
+        a busy Tk thread) but never early, so the earliest arrivals are the truest
+    A counter that jumps forward means dropped reports, one that repeats is a duplicate; both
+    are counted. Devices whose counter doesn't move (the dummy device) fall back to host time.
+    Times are monotonic seconds (time.monotonic() scale) and never go backwards.
+    """
+
+    def __init__(self, window=512, stall_reports=3, offset_follow=0.02):
+        self.window = window
+        self.stall_reports = stall_reports  # repeats before the counter is considered stalled
+        self.offset_follow = offset_follow  # how fast the offset follows arrivals that get later
+        self.dropped = 0
+        self.duplicates = 0
+        self.resyncs = 0
+        self.last_time = float('-inf')
+        self.resync()
+
+    def resync(self):
+        self._last_counter = None
+        self._repeats = 0
+        self._tick = 0
+        self._points = deque()
+        self._origin = None  # (tick, host) of the first report, keeps the sums small
+        self._sums = [0.0, 0.0, 0.0, 0.0]  # sum t, sum h, sum t*t, sum t*h (relative to origin)
+        self.period = None
+        self.offset = None
+
+    def stamp(self, counter, host_time):
+        """Device-derived time of a report with counter data[0] that arrived at host_time."""
+        if self._last_counter is not None:
+            delta = (counter - self._last_counter) % 256
+            if delta == 0:
+                self.duplicates += 1
+                self._repeats += 1
+                if self._repeats >= self.stall_reports:
+                    return self._monotonic(host_time)  # counter isn't moving, use host time
+                return self._monotonic(self.device_time(self._tick))
+            if delta > 128:
+                self.resyncs += 1  # went backwards: device reset or reports out of order
+                self.resync()
+            else:
+                self.dropped += delta - 1
+                self._tick += delta
+        self._last_counter = counter
+        self._repeats = 0
+        self._fit(self._tick, host_time)
+        return self._monotonic(self.device_time(self._tick))
+
+    def now(self, host_time):
+        """Time for a read that returned no report."""
+        return self._monotonic(host_time)
+
+    def device_time(self, tick):
+        if self.period is None:
+            return self._origin[1]
+        return self._origin[1] + self.offset + self.period * (tick - self._origin[0])
+
+    def _fit(self, tick, host_time):
+        if self._origin is None:
+            self._origin = (tick, host_time)
+        t, h = tick - self._origin[0], host_time - self._origin[1]
+        sums = self._sums
+        self._points.append((t, h))
+        sums[0] += t
+        sums[1] += h
+        sums[2] += t * t
+        sums[3] += t * h
+        if len(self._points) > self.window:
+            old_t, old_h = self._points.popleft()
+            sums[0] -= old_t
+            sums[1] -= old_h
+            sums[2] -= old_t * old_t
+            sums[3] -= old_t * old_h
+        n = len(self._points)
+        denominator = n * sums[2] - sums[0] * sums[0]
+        if n < 2 or denominator <= 0:
+            return
+        self.period = (n * sums[3] - sums[0] * sums[1]) / denominator
+        residual = h - self.period * t
+        if self.offset is None or residual < self.offset:
+            self.offset = residual
+        else:
+            self.offset += (residual - self.offset) * self.offset_follow
+
+    def _monotonic(self, t):
+        if t < self.last_time:
+            t = self.last_time
+        self.last_time = t
+        return t
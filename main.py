@@ -1,4 +1,4 @@
-import hid
+from gui_src import startup  # first, so the startup clock covers the other imports
 from gui_src.gui import FencingGui
 
 # diff colors for each player? -> take up the whole side of the screen
@@ -13,28 +13,42 @@ from gui_src.gui import FencingGui
 
 
 import sys
-from dummy import find_dummy_device
+from functools import partial
 
+startup.mark("imports")
 
-def find_vsm_device():
-    if '--dummy' in sys.argv:
-        return find_dummy_device()
-        
-    # Vendor ID and Product ID for the VSM device
-    vendor_id = 0x04bc
-    product_id = 0xc001
+# hid and the dummy device's pynput are imported lazily by their backends, on the device
+# thread, so they never delay the scoreboard appearing
+#
+# Device backends (see gui_src/devices.py):
+#   python main.py                                      real VSM over USB HID
+#   python main.py --dummy                              keyboard l / r keys
+#   python main.py --backend replay --capture FILE [--speed 2]
+#   python main.py --backend sim [--seed 1]
+#   python main.py --backend network --address host:port[,host:port...]
+BACKEND_OPTIONS = ('capture', 'speed', 'address', 'seed', 'strips')
 
-    # Find the device
-    device = hid.device()
-    try:
-        device.open(vendor_id, product_id)
-        print(f"Manufacturer: {device.get_manufacturer_string()}")
-        print(f"Product: {device.get_product_string()}")
-        return device
-    except IOError as e:
-        #print(f"Error opening device: {e}")
-        #print("Is the device connected and do you have the right permissions?")
-        return None
+device_backend = None
+
+
+def _arg_value(flag, default=None):
+    if flag in sys.argv and sys.argv.index(flag) + 1 < len(sys.argv):
+        return sys.argv[sys.argv.index(flag) + 1]
+    return default
+
+
+def find_vsm_device(index=None):
+    """
+    Opens the VSM device, or None if it's not there. With several devices (overview mode),
+    index picks the index-th one, ordered so each strip keeps its tile across restarts.
+    """
+    global device_backend
+    if device_backend is None:
+        from gui_src.devices import get_backend
+        name = 'dummy' if '--dummy' in sys.argv else _arg_value('--backend', 'hid')
+        options = {key: _arg_value(f'--{key}') for key in BACKEND_OPTIONS if f'--{key}' in sys.argv}
+        device_backend = get_backend(name, **options)
+    return device_backend.open_index(index)
 
 
 # Status constants for clarity
@@ -91,7 +105,54 @@ def detect_hit_state(data):
 if __name__ == "__main__":
     print("Running Scorer. Press Ctrl+C to quit")
     try:
-        gui = FencingGui(find_vsm_device, detect_hit_state)
+        if '--startup-report' in sys.argv:
+            startup.enable()  # time to window and first frame, see gui_src/startup.py
+        telemetry_path = _arg_value('--telemetry')  # binary event log, see gui_src/telemetry.py
+        if telemetry_path:
+            from gui_src import telemetry
+            from gui_src.settings import TELEMETRY_LEVEL
+            telemetry.start(telemetry_path, _arg_value('--telemetry-level', TELEMETRY_LEVEL))
+        # live metrics for the GUI process, see gui_src/metrics.py
+        if _arg_value('--metrics-port'):
+            from gui_src import metrics
+            metrics.serve(int(_arg_value('--metrics-port')))
+        if _arg_value('--metrics-file'):
+            from gui_src import metrics
+            metrics.write_snapshots(_arg_value('--metrics-file'))
+        from gui_src.profiler import PROFILER, install_signal_handler
+        install_signal_handler()  # kill -USR1 <pid> toggles profiling, like F9 in the window
+        if '--profile' in sys.argv:
+            PROFILER.start()
+        ruleset = _arg_value('--rules')  # scoring mode from rulesets/, e.g. --rules lockout
+        if ruleset:
+            from gui_src.rules import find_ruleset
+            find_ruleset(ruleset)  # fail early on a missing rule set (it's compiled on the device thread)
+        state_filter = _arg_value('--filter')  # sub-sample filter, e.g. --filter majority (gui_src/filters.py)
+        if state_filter:
+            from gui_src.filters import FILTERS
+            if state_filter not in FILTERS:
+                raise ValueError(f"Unknown state filter '{state_filter}'. Available: {', '.join(sorted(FILTERS))}")
+        # read the device and score in a separate process, isolated from GUI load (gui_src/remote.py)
+        scoring_process = '--scoring-process' in sys.argv
+        # timestamp reports from the VSM's report counter instead of host arrival time (DeviceClock)
+        device_clock = '--device-clock' in sys.argv
+        # drain every waiting report per read, so a delayed device thread catches up in one pass
+        batch_read = '--batch-read' in sys.argv
+        record_dir = _arg_value('--record')  # record every report to this directory, see rescore.py
+        if '--tiles' in sys.argv:
+            # overview mode: one tile per strip, e.g. python main.py --tiles 4
+            from gui_src.tiled import TiledGui
+            n_strips = int(sys.argv[sys.argv.index('--tiles') + 1])
+            gui = TiledGui([partial(find_vsm_device, index=i) for i in range(n_strips)], detect_hit_state,
+                           ruleset=ruleset, state_filter=state_filter, scoring_process=scoring_process,
+                           device_clock=device_clock, batch_read=batch_read, record_dir=record_dir)
+        else:
+            # --replay FILE plays a recorded bout with a scrub bar instead of reading the device
+            gui = FencingGui(find_vsm_device, detect_hit_state, ruleset=ruleset, state_filter=state_filter,
+                             scoring_process=scoring_process, device_clock=device_clock,
+                             batch_read=batch_read, record_dir=record_dir, replay=_arg_value('--replay'),
+                             replay_speed=float(_arg_value('--speed', 1.0)))
+        startup.mark("window created")
         gui.run()
     except:
         import traceback
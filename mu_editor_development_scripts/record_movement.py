@@ -1,22 +1,27 @@
 import time
+import json
 from seeed_xiao_nrf52840 import IMU
 
 with IMU() as imu:
     while True:
-        print("Ready - hit Enter then perform your motion")
-        input()
+        print("Ready - type a label (edge/flat/tap/point), hit Enter then perform your motion")
+        label = input().strip() or "unlabeled"
 
         samples = []
+        raw = []
         duration = 1.0
+        interval = 0.01
         start = time.monotonic()
 
         while time.monotonic() - start < duration:
             x, y, z = imu.acceleration
             mag = ((x**2) + (y**2) + ((z - 9.8)**2)) ** 0.5
             samples.append(round(mag, 2))
-            time.sleep(0.01)
+            raw.append((round(x, 3), round(y, 3), round(z, 3)))
+            time.sleep(interval)
 
         print("Done!")
         print(samples)
+        # one line per window - copy these into a file for slash_classifier.py
+        print(json.dumps({"label": label, "dt": interval, "samples": raw}))
         print("---")
-
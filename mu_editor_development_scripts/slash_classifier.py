@@ -0,0 +1,183 @@
+# Offline feature extraction + threshold tuning for the sabre slash gate.
+# Runs on the host (needs numpy), NOT on the XIAO - once the thresholds are picked
+# they get copied into the firmware as plain constants (see feasibility_analysis.md).
+#
+# Input is a file of recorded windows, one JSON object per line, as printed by
+# record_movement.py:
+#     {"label": "edge", "dt": 0.01, "samples": [[x, y, z], [x, y, z], ...]}
+#
+# Usage:
+#     python slash_classifier.py recordings.jsonl
+#     python slash_classifier.py recordings.jsonl --force 2:8:0.5 --ratio 1:3:0.25 --edge-axis 0 --flat-axis 1
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+
+G = 9.80665  # m/s^2, the IMU reports acceleration in m/s^2
+GRAVITY_AXIS = 2  # record_movement.py subtracts gravity from z
+
+# Defaults from feasibility_analysis.md
+EDGE_AXIS = 0
+FLAT_AXIS = 1
+FORCE_THRESHOLD_G = 3.0
+EDGE_RATIO = 1.5
+
+# labels that should close the relay; everything else ("flat", "tap", "point", ...) should not
+VALID_LABELS = ("edge",)
+
+
+def load_windows(path):
+    """
+    Loads recorded windows into one padded array.
+    Returns (windows, lengths, labels, dt) where windows has shape (n_windows, n_samples, 3)
+    with gravity removed and zero padding past each window's length.
+    """
+    raw, labels = [], []
+    dt = None
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or not line.startswith("{"):
+                continue  # skip "Ready"/"Done!" lines copied from the serial console
+            rec = json.loads(line)
+            raw.append(np.asarray(rec['samples'], dtype=np.float32).reshape(-1, 3))
+            labels.append(rec.get('label', 'unknown'))
+            if dt is None:
+                dt = float(rec.get('dt', 0.01))
+
+    if not raw:
+        raise ValueError(f"No windows found in {path}")
+
+    lengths = np.array([len(r) for r in raw])
+    windows = np.zeros((len(raw), lengths.max(), 3), dtype=np.float32)
+    for i, r in enumerate(raw):
+        windows[i, :len(r)] = r
+        windows[i, :len(r), GRAVITY_AXIS] -= G
+    return windows, lengths, np.array(labels), dt
+
+
+def extract_features(windows, lengths, dt=0.01, edge_axis=EDGE_AXIS, flat_axis=FLAT_AXIS):
+    """
+    Computes per-window features for a whole batch at once.
+    windows: (n_windows, n_samples, 3) gravity-free acceleration in m/s^2, zero padded.
+    Returns a dict of (n_windows,) arrays:
+      peak_g      - peak vector magnitude in g
+      peak_index  - sample index of that peak
+      impulse_ms  - width of the impulse around the peak (samples above half the peak), in ms
+      energy      - (n_windows, 3) per-axis energy (sum of squared acceleration, g^2)
+      edge_g      - peak |acceleration| on the edge axis, in g
+      flat_g      - peak |acceleration| on the flat axis, in g
+    """
+    n_windows, n_samples, _ = windows.shape
+    valid = np.arange(n_samples)[None, :] < lengths[:, None]  # mask out the padding
+
+    accel_g = windows / G
+    mag = np.sqrt(np.einsum('nsk,nsk->ns', accel_g, accel_g))
+    mag = np.where(valid, mag, 0.0)
+
+    peak_index = mag.argmax(axis=1)
+    peak_g = mag[np.arange(n_windows), peak_index]
+
+    # contiguous run of samples above half the peak, centred on the peak
+    above = mag >= (peak_g[:, None] * 0.5)
+    idx = np.arange(n_samples)[None, :]
+    before = (~above) & (idx < peak_index[:, None])
+    after = (~above) & (idx > peak_index[:, None])
+    start = np.where(before.any(axis=1), n_samples - 1 - before[:, ::-1].argmax(axis=1) + 1, 0)
+    end = np.where(after.any(axis=1), after.argmax(axis=1), lengths)
+    impulse_ms = (end - start) * dt * 1000
+
+    energy = np.einsum('nsk,nsk->nk', accel_g, accel_g)
+    abs_g = np.abs(accel_g)
+    edge_g = abs_g[:, :, edge_axis].max(axis=1)
+    flat_g = abs_g[:, :, flat_axis].max(axis=1)
+
+    return {
+        'peak_g': peak_g,
+        'peak_index': peak_index,
+        'impulse_ms': impulse_ms,
+        'energy': energy,
+        'edge_g': edge_g,
+        'flat_g': flat_g,
+    }
+
+
+def classify(features, force_threshold=FORCE_THRESHOLD_G, edge_ratio=EDGE_RATIO):
+    """Same two-condition check the firmware will run: enough force AND edge dominant."""
+    edge_g, flat_g = features['edge_g'], features['flat_g']
+    return (edge_g > force_threshold) & (edge_g > flat_g * edge_ratio)
+
+
+def evaluate_grid(features, truth, force_thresholds, edge_ratios):
+    """
+    Scores every (force_threshold, edge_ratio) pair against the labels in one broadcast.
+    Returns (accuracy, false_accepts, false_rejects), each shaped (n_force, n_ratio).
+    """
+    edge_g = features['edge_g'][None, None, :]
+    flat_g = features['flat_g'][None, None, :]
+    force = np.asarray(force_thresholds, dtype=np.float32)[:, None, None]
+    ratio = np.asarray(edge_ratios, dtype=np.float32)[None, :, None]
+
+    predicted = (edge_g > force) & (edge_g > flat_g * ratio)  # (n_force, n_ratio, n_windows)
+    truth = truth[None, None, :]
+
+    accuracy = (predicted == truth).mean(axis=2)
+    false_accepts = (predicted & ~truth).sum(axis=2)
+    false_rejects = (~predicted & truth).sum(axis=2)
+    return accuracy, false_accepts, false_rejects
+
+
+def _parse_range(text):
+    # "start:stop:step" (stop inclusive) or a single value
+    parts = [float(p) for p in text.split(':')]
+    if len(parts) == 1:
+        return np.array(parts)
+    start, stop, step = parts
+    return np.arange(start, stop + step / 2, step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate slash gate thresholds on recorded IMU windows")
+    parser.add_argument("recordings", help="JSON-lines file written from record_movement.py output")
+    parser.add_argument("--force", default="1:8:0.5", help="force thresholds in g, start:stop:step")
+    parser.add_argument("--ratio", default="1:3:0.25", help="edge/flat ratios, start:stop:step")
+    parser.add_argument("--edge-axis", type=int, default=EDGE_AXIS)
+    parser.add_argument("--flat-axis", type=int, default=FLAT_AXIS)
+    parser.add_argument("--top", type=int, default=10, help="how many settings to print")
+    args = parser.parse_args(argv)
+
+    windows, lengths, labels, dt = load_windows(args.recordings)
+    truth = np.isin(labels, VALID_LABELS)
+    force_thresholds = _parse_range(args.force)
+    edge_ratios = _parse_range(args.ratio)
+
+    start = time.perf_counter()
+    features = extract_features(windows, lengths, dt, args.edge_axis, args.flat_axis)
+    accuracy, false_accepts, false_rejects = evaluate_grid(features, truth, force_thresholds, edge_ratios)
+    elapsed = time.perf_counter() - start
+
+    n_scored = len(labels) * accuracy.size
+    print(f"{len(labels)} windows ({truth.sum()} valid), {accuracy.size} settings")
+    print(f"Scored {n_scored} window/setting pairs in {elapsed * 1000:.1f} ms "
+          f"({n_scored / max(elapsed, 1e-9):,.0f} per second)")
+
+    for label in np.unique(labels):
+        sel = labels == label
+        print(f"  {label:>8}: n={sel.sum():4d}  peak={features['peak_g'][sel].mean():5.2f}g  "
+              f"edge={features['edge_g'][sel].mean():5.2f}g  flat={features['flat_g'][sel].mean():5.2f}g  "
+              f"impulse={features['impulse_ms'][sel].mean():5.1f}ms")
+
+    print("---")
+    print(f"{'force(g)':>9} {'ratio':>6} {'accuracy':>9} {'false acc':>10} {'false rej':>10}")
+    order = np.argsort(-accuracy, axis=None, kind='stable')[:args.top]
+    for flat_index in order:
+        i, j = np.unravel_index(flat_index, accuracy.shape)
+        print(f"{force_thresholds[i]:9.2f} {edge_ratios[j]:6.2f} {accuracy[i, j]:9.3f} "
+              f"{false_accepts[i, j]:10d} {false_rejects[i, j]:10d}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,272 @@
+# Re-scores recorded bouts offline under many settings at once, on every CPU core.
+#
+# Captures are testing/device.py logs or recordings made with `python main.py --record DIR`.
+# Every (capture, settings) combination is scored headlessly with the same BoutScorer /
+# RuleScorer the live device loop uses, and one row per combination goes to a CSV table.
+#
+# Usage:
+#     python rescore.py captures/ --grid hit_dmg=20,30,40 --grid sec_before_cont_dmg=0.3,0.5
+#     python rescore.py captures/ --grid ruleset=none,lockout,counter --out results.csv
+#
+# The captures are parsed once, packed into two shared-memory blocks (42 bytes per report,
+# one float64 timestamp per report) and mapped read-only by the workers, so adding workers
+# or settings doesn't multiply the parsing or the memory.
+import os
+import sys
+import csv
+import time
+import argparse
+import itertools
+from array import array
+from datetime import timedelta
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from gui_src.bout import default_settings
+from gui_src.capture import list_captures, read_capture, fill_gaps
+from gui_src.devices import REPORT_SIZE
+from gui_src.filters import make_detector
+from gui_src.player import ScoringManager
+from gui_src.scorer import BoutScorer
+from gui_src.settings import DEVICE_CLOCK_WINDOW
+from gui_src.timers import DeviceClock
+from gui_src.rules import SCORE_MESSAGES
+from main import detect_hit_state
+
+TOUCH_MESSAGES = {message: key for key, message in SCORE_MESSAGES.items()}
+RESULT_COLUMNS = ['capture', 'left_hp', 'right_hp', 'winner', 'win_time',
+                  'left_touches', 'right_touches', 'left_self', 'right_self', 'duration']
+
+
+def pack_captures(paths, fill_interval=0.01):
+    """
+    Parses captures into flat buffers: (reports, times, bouts).
+    reports holds REPORT_SIZE bytes per report, times the seconds since the bout's first report,
+    and bouts is [(name, start_time, first_report, n_reports), ...].
+    """
+    reports, times, bouts = bytearray(), array('d'), []
+    for path in paths:
+        capture = [(when, data) for when, data in read_capture(path) if data]
+        if not capture:
+            print(f"Skipping {path}: no reports", file=sys.stderr)
+            continue
+        capture = fill_gaps(capture, fill_interval)
+        start = capture[0][0]
+        bouts.append((os.path.basename(path), start, len(times), len(capture)))
+        for when, data in capture:
+            reports += bytes(data[:REPORT_SIZE]).ljust(REPORT_SIZE, b'\0')
+            times.append((when - start).total_seconds())
+    return bytes(reports), times, bouts
+
+
+def score_bout(reports, times, start_time, settings, detect_hit_state=detect_hit_state):
+    """
+    Scores one bout headlessly. reports/times are as packed by pack_captures (any buffer works,
+    e.g. a memoryview slice). Returns a dict with the final HP, winner and every scored touch.
+    """
+    scoring_manager = ScoringManager(settings)
+    touches = []  # (seconds, side, 'touch' | 'self' | 'held'), 'held' = a held touch starts continuous damage
+    now = [0.0]
+    held = {'left': False, 'right': False}
+
+    def emit(message):
+        if message['type'] == 'status' and message['message'] in TOUCH_MESSAGES:
+            side, event = TOUCH_MESSAGES[message['message']]
+            touches.append((now[0], side, event))
+        elif message['type'] == 'cont_dmg_status':
+            # left taking damage means right is the one holding the touch
+            for taker, attacker in (('left', 'right'), ('right', 'left')):
+                if message[taker] and not held[taker]:
+                    touches.append((now[0], attacker, 'held'))
+                held[taker] = message[taker]
+
+    detect_hit_state = make_detector(detect_hit_state, settings)
+    if settings.get('ruleset'):
+        from gui_src.rules import RuleScorer
+        scorer = RuleScorer(scoring_manager, detect_hit_state, emit, start_time)
+    else:
+        scorer = BoutScorer(scoring_manager, detect_hit_state, emit, start_time)
+
+    if settings.get('device_clock'):
+        # re-stamp from the report counter, as the live loop does with --device-clock
+        device_clock = DeviceClock(DEVICE_CLOCK_WINDOW)
+        times = [device_clock.stamp(reports[i * REPORT_SIZE], t) for i, t in enumerate(times)]
+        times = [t - times[0] for t in times]
+
+    winner, win_time = None, None
+    for i in range(len(times)):
+        now[0] = times[i]
+        scorer.process(reports[i * REPORT_SIZE:(i + 1) * REPORT_SIZE],
+                       start_time + timedelta(seconds=times[i]))
+        if winner is None:
+            left_hp, right_hp = scoring_manager.get_hp()
+            if left_hp <= 0 or right_hp <= 0:
+                winner = 'right' if left_hp <= 0 else 'left'
+                win_time = times[i]
+
+    left_hp, right_hp = scoring_manager.get_hp()
+    return {
+        'left_hp': left_hp,
+        'right_hp': right_hp,
+        'winner': winner,
+        'win_time': win_time,
+        'touches': touches,
+        'duration': times[-1] if len(times) else 0.0,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Worker side: the packed captures, attached once per process
+# ---------------------------------------------------------------------------
+
+_shared = {}
+
+
+def _init_worker(reports_name, times_name, bouts):
+    reports = shared_memory.SharedMemory(name=reports_name)
+    times = shared_memory.SharedMemory(name=times_name)
+    _shared['blocks'] = (reports, times)  # keep the mappings alive
+    _shared['reports'] = reports.buf.toreadonly()
+    n_reports = sum(n for _, _, _, n in bouts)
+    _shared['times'] = times.buf[:n_reports * 8].toreadonly().cast('d')
+    _shared['bouts'] = bouts
+
+
+def _score_chunk(chunk):
+    """Scores a list of (bout_index, settings_index, settings) tasks in this worker."""
+    rows = []
+    for bout_index, settings_index, settings in chunk:
+        name, start_time, first, n_reports = _shared['bouts'][bout_index]
+        result = score_bout(_shared['reports'][first * REPORT_SIZE:(first + n_reports) * REPORT_SIZE],
+                            _shared['times'][first:first + n_reports], start_time, settings)
+        rows.append((bout_index, settings_index, result))
+    return rows
+
+
+def _chunks(tasks, n_workers):
+    """
+    Splits tasks into about 4 chunks per worker: big enough that pickling and scheduling are
+    noise next to scoring, small enough that one long bout doesn't leave the other cores idle.
+    """
+    size = max(1, len(tasks) // (n_workers * 4))
+    return [tasks[i:i + size] for i in range(0, len(tasks), size)]
+
+
+def rescore(bouts, reports, times, settings_grid, workers=None):
+    """
+    Scores every bout under every settings dict. Returns [(bout_index, settings_index, result)]
+    in (bout, settings) order.
+    """
+    tasks = [(b, s, settings) for b in range(len(bouts)) for s, settings in enumerate(settings_grid)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        _init_local(reports, times, bouts)
+        return _score_chunk(tasks)
+
+    reports_block = shared_memory.SharedMemory(create=True, size=max(1, len(reports)))
+    times_block = shared_memory.SharedMemory(create=True, size=max(1, len(times) * times.itemsize))
+    try:
+        reports_block.buf[:len(reports)] = reports
+        times_block.buf[:len(times) * times.itemsize] = times.tobytes()
+        rows = []
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(reports_block.name, times_block.name, bouts)) as executor:
+            for chunk_rows in executor.map(_score_chunk, _chunks(tasks, workers)):
+                rows.extend(chunk_rows)
+        return rows
+    finally:
+        reports_block.close()
+        reports_block.unlink()
+        times_block.close()
+        times_block.unlink()
+
+
+def _init_local(reports, times, bouts):
+    _shared['reports'] = memoryview(reports)
+    _shared['times'] = times
+    _shared['bouts'] = bouts
+
+
+# ---------------------------------------------------------------------------
+# Command line
+# ---------------------------------------------------------------------------
+
+def _parse_value(text):
+    if text.lower() == 'none':
+        return None
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def settings_grid(grid_args, base=None):
+    """['hit_dmg=20,30', 'ruleset=none,lockout'] -> one settings dict per combination."""
+    base = base or default_settings()
+    axes = []
+    for arg in grid_args:
+        key, _, values = arg.partition('=')
+        if key not in base:
+            raise ValueError(f"Unknown setting '{key}'. Known: {', '.join(base)}")
+        axes.append([(key, _parse_value(v)) for v in values.split(',') if v])
+    return [{**base, **dict(combo)} for combo in itertools.product(*axes)]
+
+
+def result_row(bout, settings, result, grid_keys):
+    touches = result['touches']
+    return {
+        'capture': bout[0],
+        **{key: settings[key] for key in grid_keys},
+        'left_hp': round(result['left_hp'], 2),
+        'right_hp': round(result['right_hp'], 2),
+        'winner': result['winner'] or '',
+        'win_time': '' if result['win_time'] is None else f"{result['win_time']:.3f}",
+        'left_touches': sum(1 for _, side, event in touches if side == 'left' and event == 'touch'),
+        'right_touches': sum(1 for _, side, event in touches if side == 'right' and event == 'touch'),
+        'left_self': sum(1 for _, side, event in touches if side == 'left' and event == 'self'),
+        'right_self': sum(1 for _, side, event in touches if side == 'right' and event == 'self'),
+        'duration': f"{result['duration']:.3f}",
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score recorded bouts across a grid of settings")
+    parser.add_argument('captures', help="directory of captures (or a single capture file)")
+    parser.add_argument('--grid', action='append', default=[], metavar='SETTING=V1,V2,...',
+                        help=f"setting values to try, repeatable. Settings: {', '.join(default_settings())}")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--fill-interval', type=float, default=0.01,
+                        help="report spacing used to fill gaps in change-only logs (seconds)")
+    parser.add_argument('--out', help="CSV file to write (default: stdout)")
+    args = parser.parse_args(argv)
+
+    paths = list_captures(args.captures) if os.path.isdir(args.captures) else [args.captures]
+    grid = settings_grid(args.grid)
+    grid_keys = [arg.partition('=')[0] for arg in args.grid]
+
+    t = time.perf_counter()
+    reports, times, bouts = pack_captures(paths, args.fill_interval)
+    if not bouts:
+        sys.exit(f"No captures with reports in {args.captures}")
+    print(f"Loaded {len(bouts)} captures, {len(times)} reports in {time.perf_counter() - t:.2f} s", file=sys.stderr)
+
+    t = time.perf_counter()
+    rows = rescore(bouts, reports, times, grid, workers=args.workers)
+    elapsed = time.perf_counter() - t
+    print(f"Scored {len(rows)} runs ({len(times) * len(grid)} reports) in {elapsed:.2f} s", file=sys.stderr)
+
+    out = open(args.out, 'w', newline='') if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(out, fieldnames=['capture', *grid_keys, *RESULT_COLUMNS[1:]])
+        writer.writeheader()
+        for bout_index, settings_index, result in rows:
+            writer.writerow(result_row(bouts[bout_index], grid[settings_index], result, grid_keys))
+    finally:
+        if args.out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
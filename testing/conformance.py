@@ -0,0 +1,359 @@
+# Differential conformance check: runs a candidate decoder / scorer side by side with today's
+# (main.detect_hit_state and BoutScorer) and reports the first place they disagree, shrunk to a
+# minimal reproducer. `python -m pytest testing/` runs a reduced check (test_conformance.py);
+# run the full one before any change to the hot path reaches a strip.
+#
+# Usage:
+#     python -m testing.conformance                                   # built-in fast paths
+#     python testing/conformance.py                                   # same thing
+#     python -m testing.conformance --decoder decode_table:detect_hit_state --scorer classic
+#     python -m testing.conformance --sequences 20000 --save repro.json
+#     python -m testing.conformance --repro repro.json                # re-run a saved reproducer
+#
+# Decoder: every one of the 65,536 (byte2, byte3) combinations, with the rest of the report
+# random, as a list and as bytes, plus short reports. Outputs must be identical.
+#
+# Scorer: --sequences random bouts of --length reads each, every one from its own seed, scored
+# by both in parallel on all cores. Codes change like a sticky Markov chain over the decodable
+# codes (with the odd random byte), the 20 sub-samples of a report are a delay line, reads come
+# ~10 ms apart with jitter, bursts, repeated timestamps, long gaps and empty reads (timeouts),
+# and settings (debounce, continuous damage delay and rate, max HP) are drawn per bout. After
+# every read both must have emitted the same messages and hold the same HP (--tolerance for
+# float HP). A candidate that raises counts as diverging.
+#
+# On a divergence the bout is cut at it, then shrunk (delta debugging) to the fewest reads that
+# still diverge, with reports and times simplified where that keeps it diverging.
+#
+# Candidates are module:attribute specs or a built-in name:
+#   --decoder table     the 256-entry translate tables of gui_src.filters (default)
+#   --decoder reference main.detect_hit_state itself
+#   --scorer bout       BoutScorer, fed the candidate decoder (default)
+#   --scorer classic    RuleScorer with rulesets/classic.json - similar rules, not the same:
+#                       it shows where the rule engine and BoutScorer part ways
+# A scorer is called like BoutScorer(scoring_manager, detect_hit_state, emit, start_time).
+import os
+import sys
+import json
+import random
+import argparse
+import importlib
+import itertools
+from functools import partial
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+
+if not __package__:
+    # run as a script (python testing/conformance.py): import the repo's modules from its root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gui_src.bout import default_settings
+from gui_src.devices import REPORT_SIZE
+from gui_src.filters import decode_tables
+from gui_src.player import ScoringManager
+from gui_src.scorer import BoutScorer
+from main import detect_hit_state
+
+START_TIME = datetime(2025, 1, 1)
+SUBSAMPLES = (REPORT_SIZE - 2) // 2
+NEUTRAL = (4, 80)  # (left, right) codes of a quiet strip
+SEQUENCES_PER_TASK = 50
+
+# Settings drawn per bout: the edges (0, tiny max HP) are where implementations tend to differ
+SETTING_CHOICES = {
+    'debounce_time': (0.0, 0.05, 0.1, 0.3, 1.0),
+    'sec_before_cont_dmg': (0.0, 0.1, 0.5, 1.0),
+    'hit_dmg_per_ms': (0.0, 0.01, 0.1),
+    'max_hp': (50, 500, 5000),
+}
+
+
+# ---------------------------------------------------------------------------
+# Candidates
+# ---------------------------------------------------------------------------
+
+def table_decoder(reference):
+    """reference as one lookup per side, through the tables the state filters decode with."""
+    statuses, left, right = decode_tables(reference)
+    unknown = reference([])
+
+    def decode(data):
+        if len(data) < 4:
+            return unknown
+        return statuses[left[data[2]]], statuses[right[data[3]]]
+    return decode
+
+
+def _classic(scoring_manager, detect_hit_state, emit, start_time):
+    from gui_src.rules import RuleScorer
+    return RuleScorer(scoring_manager, detect_hit_state, emit, start_time, ruleset='classic')
+
+
+DECODERS = {'reference': lambda: detect_hit_state, 'table': lambda: table_decoder(detect_hit_state)}
+SCORERS = {'bout': lambda: BoutScorer, 'classic': lambda: _classic}
+
+
+def load(spec, builtins):
+    """A built-in candidate by name, or `module:attribute`."""
+    if spec in builtins:
+        return builtins[spec]()
+    module, _, attribute = spec.partition(':')
+    if not attribute:
+        raise ValueError(f"'{spec}' is neither a built-in ({', '.join(builtins)}) nor module:attribute")
+    return getattr(importlib.import_module(module), attribute)
+
+
+# ---------------------------------------------------------------------------
+# Decoder
+# ---------------------------------------------------------------------------
+
+def check_decoder(decoder, seed=0):
+    """
+    Every (byte2, byte3) pair plus short reports. Returns (cases checked, divergences, first
+    divergence as (report, reference output, candidate output) or None).
+    """
+    rng = random.Random(seed)
+    tail = [rng.randrange(256) for _ in range(REPORT_SIZE)]
+    cases, divergences, first = 0, 0, None
+
+    def compare(report):
+        nonlocal cases, divergences, first
+        cases += 1
+        expected = detect_hit_state(report)
+        try:
+            got = decoder(report)
+        except Exception as e:
+            got = f"raised {e!r}"
+        if got != expected:
+            divergences += 1
+            if first is None:
+                first = (report, expected, got)
+
+    for length in range(4):
+        compare(tail[:length])
+        compare(bytes(tail[:length]))
+    for byte2, byte3 in itertools.product(range(256), repeat=2):
+        tail[0] = rng.randrange(256)
+        report = tail[:2] + [byte2, byte3] + tail[4:]
+        compare(report)
+        compare(bytes(report))
+    if first is not None:
+        first = (_shrink_report(first[0], lambda r: detect_hit_state(r) != _call(decoder, r)),) + first[1:]
+    return cases, divergences, first
+
+
+def _call(decoder, report):
+    try:
+        return decoder(report)
+    except Exception as e:
+        return f"raised {e!r}"
+
+
+def _shrink_report(report, diverges):
+    """The shortest / plainest form of report that still diverges."""
+    kind = type(report)
+    for candidate in ([0, 0] + list(report[2:4]), report[:4], [0, 0] + list(report[2:4]) * SUBSAMPLES):
+        candidate = kind(candidate)
+        if diverges(candidate):
+            return candidate
+    return report
+
+
+# ---------------------------------------------------------------------------
+# Scorer
+# ---------------------------------------------------------------------------
+
+def random_bout(seed, length):
+    """(settings, [(seconds since start, report or [] for a timed-out read), ...]) for one seed."""
+    rng = random.Random(seed)
+    settings = default_settings()
+    for key, choices in SETTING_CHOICES.items():
+        settings[key] = rng.choice(choices)
+    statuses, left_table, right_table = decode_tables(detect_hit_state)
+    known = [[code for code in range(256) if statuses[table[code]] != "UNKNOWN"] for table in (left_table, right_table)]
+    stay = rng.uniform(0.6, 0.99)  # chance a side keeps its code from one sub-sample to the next
+    per_read = rng.choice((1, 1, 2, 5, SUBSAMPLES))  # new sub-samples per report
+    codes = list(NEUTRAL)
+    history = [NEUTRAL] * SUBSAMPLES  # sub-sample pairs, newest first
+    trace, t = [], 0.0
+    for counter in range(length):
+        r = rng.random()
+        if r < 0.75:
+            t += max(0.0, rng.gauss(0.01, 0.002))
+        elif r < 0.85:
+            t += rng.uniform(0.0, 0.002)  # burst of queued reports
+        elif r < 0.92:
+            pass  # same timestamp again
+        else:
+            t += rng.uniform(0.05, 1.5)
+        if rng.random() < 0.03:
+            trace.append((t, []))
+            continue
+        for _ in range(per_read):
+            for side in (0, 1):
+                if rng.random() > stay:
+                    codes[side] = rng.choice(known[side]) if rng.random() < 0.95 else rng.randrange(256)
+            history = [tuple(codes)] + history[:-1]
+        trace.append((t, [counter % 256, 0] + [code for pair in history for code in pair]))
+    return settings, trace
+
+
+class Runner:
+    """One scorer with its own ScoringManager; step() returns what it did for one read."""
+
+    def __init__(self, scorer, decoder, settings):
+        self.messages = []
+        self.scoring_manager = ScoringManager(dict(settings))
+        self.scorer = scorer(self.scoring_manager, decoder, self.messages.append, START_TIME)
+
+    def step(self, t, data):
+        self.messages.clear()
+        try:
+            self.scorer.process(data, START_TIME + timedelta(seconds=t))
+        except Exception as e:
+            return f"raised {e!r}", None
+        return list(self.messages), self.scoring_manager.get_hp()
+
+
+def _same(expected, got, tolerance):
+    if expected[0] != got[0]:
+        return False
+    if expected[1] is None or got[1] is None:
+        return expected[1] == got[1]
+    return all(abs(a - b) <= tolerance for a, b in zip(expected[1], got[1]))
+
+
+def first_divergence(settings, trace, scorer, decoder, tolerance):
+    """(read index, reference output, candidate output) of the first read they disagree on, or None."""
+    reference = Runner(BoutScorer, detect_hit_state, settings)
+    candidate = Runner(scorer, decoder, settings)
+    for i, (t, data) in enumerate(trace):
+        expected, got = reference.step(t, data), candidate.step(t, data)
+        if not _same(expected, got, tolerance):
+            return i, expected, got
+    return None
+
+
+def check_seeds(seeds, length, scorer_spec, decoder_spec, tolerance):
+    """Worker: (reads scored, first diverging seed or None)."""
+    scorer, decoder = load(scorer_spec, SCORERS), load(decoder_spec, DECODERS)
+    reads = 0
+    for seed in seeds:
+        settings, trace = random_bout(seed, length)
+        reads += len(trace)
+        if first_divergence(settings, trace, scorer, decoder, tolerance) is not None:
+            return reads, seed
+    return reads, None
+
+
+def minimize(settings, trace, diverges):
+    """Delta debugging: drops reads (and then simplifies the rest) while the bout still diverges."""
+    n = 2
+    while len(trace) >= 2:
+        chunk = -(-len(trace) // n)
+        for start in range(0, len(trace), chunk):
+            complement = trace[:start] + trace[start + chunk:]
+            if diverges(settings, complement):
+                trace, n = complement, max(n - 1, 2)
+                break
+        else:
+            if n >= len(trace):
+                break
+            n = min(len(trace), 2 * n)
+    simplifications = (lambda t, data: (t, [0, 0] + data[2:4] * SUBSAMPLES if data else data),
+                       lambda t, data: (round(t, 2), data))
+    for i in range(len(trace)):
+        for simplify in simplifications:
+            simpler = simplify(*trace[i])
+            attempt = trace[:i] + [simpler] + trace[i + 1:]
+            if simpler != trace[i] and diverges(settings, attempt):
+                trace = attempt
+    return trace
+
+
+def describe(trace):
+    lines = []
+    for t, data in trace:
+        if not data:
+            lines.append(f"  {t:9.4f}s  (empty read)")
+            continue
+        plain = data == [0, 0] + data[2:4] * SUBSAMPLES
+        codes = f"byte2={data[2]:3d} byte3={data[3]:3d} -> {detect_hit_state(data)}"
+        lines.append(f"  {t:9.4f}s  {codes}" + ("" if plain else f"  report {data}"))
+    return '\n'.join(lines)
+
+
+def report_divergence(settings, trace, scorer, decoder, tolerance, save=None):
+    """Shrinks a diverging bout, prints the reproducer and optionally saves it as JSON."""
+    def diverges(settings, trace):
+        return first_divergence(settings, trace, scorer, decoder, tolerance) is not None
+
+    i, _, _ = first_divergence(settings, trace, scorer, decoder, tolerance)
+    trace = minimize(settings, trace[:i + 1], diverges)
+    i, expected, got = first_divergence(settings, trace, scorer, decoder, tolerance)
+    changed = {key: value for key, value in settings.items() if default_settings().get(key) != value}
+    print(f"Minimized to {len(trace)} reads, diverging at read {i + 1}. Settings changed from default: {changed}")
+    print(describe(trace))
+    print(f"  reference: {expected}")
+    print(f"  candidate: {got}")
+    if save:
+        with open(save, 'w') as f:
+            json.dump({'settings': settings, 'trace': trace}, f)
+        print(f"Reproducer saved to {save} (re-run with --repro {save})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check a decoder / scorer against today's, read for read")
+    parser.add_argument('--decoder', default='table', help=f"candidate decoder: {', '.join(DECODERS)} or module:function")
+    parser.add_argument('--scorer', default='bout', help=f"candidate scorer: {', '.join(SCORERS)} or module:Class")
+    parser.add_argument('--sequences', type=int, default=2000, help="random bouts to score")
+    parser.add_argument('--length', type=int, default=500, help="reads per bout")
+    parser.add_argument('--seed', type=int, default=0, help="first bout's seed (bout n uses seed + n)")
+    parser.add_argument('--tolerance', type=float, default=0.0, help="HP difference still counted as equal")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--save', help="write the minimized reproducer here (JSON)")
+    parser.add_argument('--repro', help="only re-run a reproducer saved with --save")
+    args = parser.parse_args(argv)
+
+    scorer, decoder = load(args.scorer, SCORERS), load(args.decoder, DECODERS)
+    if args.repro:
+        with open(args.repro) as f:
+            saved = json.load(f)
+        trace = [(t, data) for t, data in saved['trace']]
+        if first_divergence(saved['settings'], trace, scorer, decoder, args.tolerance) is None:
+            print(f"{args.repro}: no divergence")
+            return
+        report_divergence(saved['settings'], trace, scorer, decoder, args.tolerance)
+        sys.exit(1)
+
+    cases, divergences, first = check_decoder(decoder, args.seed)
+    if first is not None:
+        report, expected, got = first
+        print(f"Decoder: {divergences} of {cases} reports diverge. First, minimized: {report!r}")
+        print(f"  reference: {expected}")
+        print(f"  candidate: {got}")
+        sys.exit(1)
+    print(f"Decoder: {cases} reports, all (byte2, byte3) pairs, identical", file=sys.stderr)
+
+    seeds = range(args.seed, args.seed + args.sequences)
+    tasks = [seeds[i:i + SEQUENCES_PER_TASK] for i in range(0, len(seeds), SEQUENCES_PER_TASK)]
+    reads, failed = 0, None
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        check = partial(check_seeds, length=args.length, scorer_spec=args.scorer,
+                        decoder_spec=args.decoder, tolerance=args.tolerance)
+        for task_reads, seed in executor.map(check, tasks):
+            reads += task_reads
+            if seed is not None:
+                failed = seed
+                executor.shutdown(wait=False, cancel_futures=True)
+                break
+    if failed is None:
+        print(f"Scorer: {args.sequences} bouts, {reads} reads, identical", file=sys.stderr)
+        return
+    print(f"Scorer: bout seed {failed} diverges")
+    settings, trace = random_bout(failed, args.length)
+    report_divergence(settings, trace, scorer, decoder, args.tolerance, args.save)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+# python -m pytest testing/  - a reduced run of testing/conformance.py
+from conformance import DECODERS, check_decoder, check_seeds, load
+
+
+def test_table_decoder_matches_reference():
+    cases, divergences, first = check_decoder(load('table', DECODERS))
+    assert divergences == 0, first
+
+
+def test_bout_scorer_matches_reference():
+    reads, failed = check_seeds(range(20), length=500, scorer_spec='bout', decoder_spec='table', tolerance=0.0)
+    assert failed is None, f"bout seed {failed} diverges, see python -m testing.conformance --seed {failed}"
+    assert reads == 20 * 500
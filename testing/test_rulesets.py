@@ -0,0 +1,40 @@
+# python -m pytest testing/
+from datetime import datetime, timedelta
+
+import pytest
+
+from gui_src.bout import default_settings
+from gui_src.player import ScoringManager
+from gui_src.rules import RuleScorer, SCORE_MESSAGES
+from main import detect_hit_state
+
+START = datetime(2025, 1, 1)
+NEUTRAL = [0, 0, 4, 80]
+DOUBLE_TOUCH = [0, 0, 44, 114]  # both players start HITTING_OPPONENT in the same report
+
+
+def double_touch(ruleset):
+    settings = {**default_settings(), 'ruleset': ruleset}
+    manager = ScoringManager(settings)
+    messages = []
+    scorer = RuleScorer(manager, detect_hit_state, messages.append, START)
+    scorer.process(NEUTRAL, START + timedelta(seconds=1))
+    scorer.process(DOUBLE_TOUCH, START + timedelta(seconds=1.01))
+    status = [m['message'] for m in messages if m['type'] == 'status']
+    return settings, manager.get_hp(), status, scorer.rules.phase_names[scorer.phase]
+
+
+@pytest.mark.parametrize("ruleset, phase", [
+    ("classic", "open"),
+    ("escalating", "open"),
+    ("lockout", "lockout"),
+    ("counter", "halt"),
+])
+def test_double_touch_scores_both(ruleset, phase):
+    settings, (left_hp, right_hp), status, after = double_touch(ruleset)
+    expected = settings['max_hp'] - settings['hit_dmg']
+    assert (left_hp, right_hp) == (expected, expected)
+    assert SCORE_MESSAGES[("left", "touch")] in status
+    assert SCORE_MESSAGES[("right", "touch")] in status
+    assert not [m for m in status if "locked out" in m or "COUNTER" in m]
+    assert after == phase
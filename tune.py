@@ -0,0 +1,212 @@
+# Picks debounce_time and sec_before_cont_dmg from labeled recordings instead of by feel.
+#
+# Each capture (see rescore.py) is paired with the touches a referee actually saw, in a labels
+# file mapping capture names to [seconds since the capture's first report, side, kind] entries:
+#     {"bout-20250407-154744.log": [[1.52, "left", "touch"], [3.10, "right", "held"], ...]}
+# kind is "touch" (on-target hit), "self" (self-hit) or "held" (a touch held long enough that
+# continuous damage should start). A scored touch matches a label on the same side and kind
+# within --tolerance seconds; the tuner minimises missed + spurious touches.
+#
+# Usage:
+#     python tune.py captures/ --labels captures/labels.json
+#     python tune.py captures/ --labels captures/labels.json --rounds 6 --points 7 --workers 8
+#
+# Search: a points x points grid over the bounds, then repeatedly zoom in on the best cell.
+# The objective is a step function of the settings (a touch is either matched or not), so
+# gradients are useless, but the steps are wide and a few zoom rounds pin them down with a
+# couple of hundred evaluations. Each round is scored in parallel by rescore.rescore(), and
+# every evaluated point is cached on disk, keyed by the recordings, labels and settings, so
+# re-running with more rounds or other bounds only scores what's new.
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+from gui_src.bout import default_settings
+from gui_src.capture import list_captures
+from rescore import pack_captures, rescore
+
+TUNED = ('debounce_time', 'sec_before_cont_dmg')
+DEFAULT_BOUNDS = {'debounce_time': (0.0, 1.0), 'sec_before_cont_dmg': (0.0, 2.0)}
+RESOLUTION = 0.001  # settings closer than this count as the same point (and share a cache entry)
+
+
+def match_touches(scored, labels, tolerance):
+    """
+    Pairs scored touches with labeled ones (same side and kind, within tolerance seconds),
+    earliest first. Returns (missed, spurious).
+    """
+    unmatched = sorted((t, side, kind) for t, side, kind in labels)
+    spurious = 0
+    for t, side, kind in sorted(scored):
+        for i, (label_t, label_side, label_kind) in enumerate(unmatched):
+            if label_side == side and label_kind == kind and abs(label_t - t) <= tolerance:
+                del unmatched[i]
+                break
+            if label_t > t + tolerance:
+                spurious += 1
+                break
+        else:
+            spurious += 1
+    return len(unmatched), spurious
+
+
+class ResultCache:
+    """Evaluated points for one corpus, in a JSON file: {corpus fingerprint: {point key: [missed, spurious]}}."""
+
+    def __init__(self, path, fingerprint):
+        self.path = path
+        self.fingerprint = fingerprint
+        self._all = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self._all = json.load(f)
+        self.entries = self._all.setdefault(fingerprint, {})
+
+    @staticmethod
+    def key(point):
+        return ','.join(f"{value:.3f}" for value in point)
+
+    def get(self, point):
+        return self.entries.get(self.key(point))
+
+    def put(self, point, errors):
+        self.entries[self.key(point)] = list(errors)
+
+    def save(self):
+        if not self.path:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self._all, f)
+        os.replace(tmp, self.path)  # never leave a half-written cache behind
+
+
+def corpus_fingerprint(reports, times, bouts, labels, settings, tolerance):
+    """Changes whenever anything but the tuned settings could change the result."""
+    digest = hashlib.sha1()
+    digest.update(reports)
+    digest.update(times.tobytes())
+    digest.update(json.dumps([[b[0], str(b[1])] for b in bouts]).encode())
+    digest.update(json.dumps(labels, sort_keys=True).encode())
+    digest.update(json.dumps({k: v for k, v in settings.items() if k not in TUNED}, sort_keys=True).encode())
+    digest.update(repr(tolerance).encode())
+    return digest.hexdigest()
+
+
+def evaluate(points, bouts, reports, times, labels, base_settings, tolerance, cache, workers):
+    """(missed, spurious) summed over all bouts for each point; scores only the uncached ones."""
+    todo = [p for p in dict.fromkeys(points) if cache.get(p) is None]
+    if todo:
+        grid = [{**base_settings, **dict(zip(TUNED, p))} for p in todo]
+        errors = {p: [0, 0] for p in todo}
+        for bout_index, settings_index, result in rescore(bouts, reports, times, grid, workers=workers):
+            missed, spurious = match_touches(result['touches'], labels.get(bouts[bout_index][0], []), tolerance)
+            errors[todo[settings_index]][0] += missed
+            errors[todo[settings_index]][1] += spurious
+        for p in todo:
+            cache.put(p, errors[p])
+        cache.save()
+    return {p: tuple(cache.get(p)) for p in points}
+
+
+def _axis(low, high, points):
+    step = (high - low) / (points - 1)
+    return [round(round((low + i * step) / RESOLUTION) * RESOLUTION, 3) for i in range(points)], step
+
+
+def search(evaluate_points, bounds, points=5, rounds=4, prefer=None):
+    """
+    Zooming grid search over the TUNED settings. evaluate_points(list of points) returns
+    {point: (missed, spurious)}. Ties go to fewer spurious touches, then to the point closest
+    to `prefer` (the current settings), so the tuner doesn't move settings for no gain.
+    Returns (best point, its errors, number of points evaluated).
+    """
+    seen = {}
+    if prefer:
+        seen.update(evaluate_points([prefer]))  # the current settings compete like any grid point
+    else:
+        prefer = tuple((low + high) / 2 for low, high in bounds)
+    original = bounds
+    for _ in range(rounds):
+        axes = [_axis(low, high, points) for low, high in bounds]
+        grid = [(a, b) for a in axes[0][0] for b in axes[1][0]]
+        seen.update(evaluate_points(grid))
+
+        def rank(p):
+            missed, spurious = seen[p]
+            return missed + spurious, spurious, sum((x - y) ** 2 for x, y in zip(p, prefer))
+
+        best = min(seen, key=rank)
+        # zoom: one old grid step either side of the best point, clipped to the original range
+        # (best may be the preferred point, outside the range: zoom in on the nearest edge)
+        bounds = []
+        for v, (low, high), (_, step) in zip(best, original, axes):
+            v = min(max(v, low), high)
+            bounds.append((max(low, v - step), min(high, v + step)))
+    return best, seen[best], len(seen)
+
+
+def load_labels(path):
+    with open(path) as f:
+        raw = json.load(f)
+    return {name: [(float(t), side, kind) for t, side, kind in touches] for name, touches in raw.items()}
+
+
+def _bounds(text, default):
+    if not text:
+        return default
+    low, high = (float(v) for v in text.split(':'))
+    return low, high
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune debounce_time and sec_before_cont_dmg on labeled bouts")
+    parser.add_argument('captures', help="directory of captures")
+    parser.add_argument('--labels', required=True, help="JSON file of ground-truth touches per capture")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="max seconds between a touch and its label")
+    parser.add_argument('--debounce', help="debounce_time search range low:high (default 0:1)")
+    parser.add_argument('--cont-dmg', help="sec_before_cont_dmg search range low:high (default 0:2)")
+    parser.add_argument('--points', type=int, default=5, help="grid points per setting per round")
+    parser.add_argument('--rounds', type=int, default=4, help="zoom rounds")
+    parser.add_argument('--rules', help="rule set to tune for (default: built-in scorer)")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--cache', help="cache file (default: .tune_cache.json in the captures directory)")
+    args = parser.parse_args(argv)
+    if args.points < 2:
+        parser.error("--points must be at least 2")
+
+    labels = load_labels(args.labels)
+    paths = [p for p in list_captures(args.captures)
+             if os.path.basename(p) in labels]
+    if not paths:
+        sys.exit(f"None of the captures in {args.captures} are labeled in {args.labels}")
+    reports, times, bouts = pack_captures(paths)
+
+    base_settings = {**default_settings(), 'ruleset': args.rules}
+    current = tuple(base_settings[k] for k in TUNED)
+    cache = ResultCache(args.cache or os.path.join(args.captures, '.tune_cache.json'),
+                        corpus_fingerprint(reports, times, bouts, labels, base_settings, args.tolerance))
+    bounds = [_bounds(args.debounce, DEFAULT_BOUNDS['debounce_time']),
+              _bounds(args.cont_dmg, DEFAULT_BOUNDS['sec_before_cont_dmg'])]
+
+    def evaluate_points(points):
+        return evaluate(points, bouts, reports, times, labels, base_settings, args.tolerance, cache, args.workers)
+
+    n_labels = sum(len(labels[b[0]]) for b in bouts)
+    baseline = evaluate_points([current])[current]
+    print(f"{len(bouts)} bouts, {n_labels} labeled touches")
+    print(f"current  debounce_time={current[0]:.3f} sec_before_cont_dmg={current[1]:.3f}: "
+          f"{baseline[0]} missed, {baseline[1]} spurious")
+
+    best, errors, n_points = search(evaluate_points, bounds, args.points, args.rounds, prefer=current)
+    print(f"best     debounce_time={best[0]:.3f} sec_before_cont_dmg={best[1]:.3f}: "
+          f"{errors[0]} missed, {errors[1]} spurious ({n_points} settings evaluated)")
+    print("\nFor gui_src/settings.py:")
+    print(f"DEBOUNCE_TIME_SEC = {best[0]:g}")
+    print(f"secBeforeContDmg = {best[1]:g}")
+
+
+if __name__ == "__main__":
+    main()